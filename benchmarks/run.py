@@ -0,0 +1,242 @@
+# benchmarks/run.py
+"""
+Stage timings of the dashboard's data path on synthetic exports (benchmarks.synth).
+
+For each size the generated CSV (kept under --data-dir, so reruns skip generation) goes through
+the stages the app runs: loading (cold, cache write, cache read), date filtering, RFM, every
+figure builder with the arguments its callback passes, and the forecast. Each stage is run
+--repeat times for timing and once more under tracemalloc for its peak allocation. Results are
+written as JSON; --baseline prints the ratio of each stage's median to an earlier result file.
+
+    python -m benchmarks.run --rows 10k,1M,10M
+    python -m benchmarks.run --rows 1M --skip forecast --baseline benchmarks/results/before.json
+"""
+from __future__ import annotations
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from gpay_insights import config
+from gpay_insights.data_loader import load_data_context
+from gpay_insights.figures.categories import top_categories_figure
+from gpay_insights.figures.flow_pie import flow_pie_figure
+from gpay_insights.figures.forecast import forecast_figure
+from gpay_insights.figures.heatmap import heatmap_figure
+from gpay_insights.figures.instruments import instruments_donut_figure
+from gpay_insights.figures.merchants import merchant_pareto_figure
+from gpay_insights.figures.status import status_bar_figure
+from gpay_insights.figures.time_series import cumulative_spend_figure, monthly_spend_figure
+from gpay_insights.figures.treemap import treemap_figure
+from gpay_insights.figures.txn_count import monthly_txn_count_figure
+from gpay_insights.rfm import compute_rfm
+from gpay_insights.store import HAS_ARROW
+from gpay_insights.utils.filters import apply_completed_only, apply_filters
+from gpay_insights.utils.memo import FRAMES, PAYLOADS
+
+from .synth import generate, write_csv
+
+try:
+    import resource
+except ImportError:     # not on Windows
+    resource = None
+
+ROOT = Path(__file__).resolve().parent
+SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+def parse_rows(text: str) -> list[int]:
+    """"10k,1M,10M" -> [10000, 1000000, 10000000]."""
+    out = []
+    for part in filter(None, (p.strip().lower() for p in text.split(","))):
+        mult = SUFFIXES.get(part[-1], 1)
+        out.append(int(float(part.rstrip("km")) * mult))
+    return out
+
+def _label(rows: int) -> str:
+    for suffix, mult in (("M", 1_000_000), ("k", 1_000)):
+        if rows >= mult and rows % mult == 0:
+            return f"{rows // mult}{suffix}"
+    return str(rows)
+
+def _rss_mb() -> float | None:
+    if resource is None:
+        return None
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(kb / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+def measure(fn: Callable[[], object], repeat: int, memory: bool) -> dict:
+    """Wall times of repeat calls of fn (memo caches cleared before each) and its peak allocation."""
+    times = []
+    for _ in range(repeat):
+        FRAMES.clear()
+        PAYLOADS.clear()
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    out = {"runs": repeat, "min_s": min(times), "median_s": statistics.median(times), "max_s": max(times)}
+    if memory:
+        FRAMES.clear()
+        PAYLOADS.clear()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            out["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        finally:
+            tracemalloc.stop()
+    return out
+
+def stages(csv_path: Path, cache_dir: Path) -> list[tuple[str, Callable[[], object]]]:
+    """(name, thunk) of every measured stage; loads the context once for the later ones."""
+    ctx = load_data_context(csv_path, use_cache=False)
+    end = pd.Timestamp(ctx.max_date)
+    start = (end - pd.DateOffset(years=1) + pd.Timedelta(days=1)).date()
+    dff = ctx.date_slice(start, end)
+    dff_c = apply_completed_only(dff, ctx.status_col)
+    cube_c = ctx.cube_slice(start, end)
+    d, a = ctx.date_col, ctx.amt_col
+
+    def load_cache_write():
+        for p in cache_dir.glob("*"):
+            p.unlink()
+        return load_data_context(csv_path, use_cache=True)
+
+    out = [("load_csv", lambda: load_data_context(csv_path, use_cache=False))]
+    if HAS_ARROW:
+        out += [("load_cache_write", load_cache_write),
+                ("load_cache_read", lambda: load_data_context(csv_path, use_cache=True))]
+    out += [
+        ("apply_filters", lambda: apply_filters(ctx.df, d, start, end)),
+        ("date_slice", lambda: ctx.date_slice(start, end)),
+        ("filtered_frames", lambda: (apply_completed_only(ctx.date_slice(start, end), ctx.status_col),
+                                     ctx.cube_slice(start, end))),
+        ("compute_rfm", lambda: compute_rfm(dff_c, ctx.merchant_col, d, a)),
+        ("rfm_partials", lambda: ctx.rfm(start, end)),
+        ("fig_monthly_spend", lambda: monthly_spend_figure(cube_c, d, a)),
+        ("fig_cumulative_spend", lambda: cumulative_spend_figure(cube_c, a)),
+        ("fig_top_categories", lambda: top_categories_figure(cube_c, ctx.cat_col, a)),
+        ("fig_txn_count", lambda: monthly_txn_count_figure(dff_c, d)),
+        ("fig_instruments", lambda: instruments_donut_figure(cube_c, ctx.instr_col, a)),
+        ("fig_flow_pie", lambda: flow_pie_figure(dff_c, ctx.tx_col, a, metric="amount")),
+        ("fig_heatmap", lambda: heatmap_figure(cube_c, a, metric="count")),
+        ("fig_merchant_pareto", lambda: merchant_pareto_figure(cube_c, ctx.merchant_col, a, 25)),
+        ("fig_treemap", lambda: treemap_figure(cube_c, ctx.cat_col, ctx.merchant_col, a)),
+        ("fig_status", lambda: status_bar_figure(dff, ctx.status_col or "status", a)),
+        ("forecast", lambda: forecast_figure(ctx.df, d, a, status_col=ctx.status_col)),
+    ]
+    return out
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def metadata(args) -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_rev": _git_rev(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pyarrow": HAS_ARROW,
+        "args": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+    }
+
+def _run_stages(todo, rows: int, args) -> list[dict]:
+    results = []
+    for stage, fn in todo:
+        if any(s in stage for s in args.skip) or (args.only and not any(s in stage for s in args.only)):
+            continue
+        r = {"rows": rows, "stage": stage, **measure(fn, args.repeat, not args.no_memory)}
+        results.append(r)
+        peak = f"{r['peak_mb']:9.1f} MB" if "peak_mb" in r else ""
+        print(f"{_label(rows):>5} {stage:<22} {r['median_s'] * 1000:10.1f} ms {peak}", flush=True)
+    return results
+
+def run(args) -> dict:
+    results = []
+    for rows in args.rows:
+        name = f"synthetic_{_label(rows)}_m{args.merchants}_c{args.categories}_y{args.years}_s{args.seed}.csv"
+        csv_path = args.data_dir / name
+        if not csv_path.exists():
+            print(f"generating {csv_path}", flush=True)
+            write_csv(generate(rows, args.merchants, args.categories, args.years, seed=args.seed), csv_path)
+        saved = config.CACHE_DIR
+        with tempfile.TemporaryDirectory(prefix="gpay-bench-") as cache_dir:
+            config.CACHE_DIR = Path(cache_dir)      # cache stages must not touch the app's cache
+            try:
+                measured = _run_stages(stages(csv_path, config.CACHE_DIR), rows, args)
+            finally:
+                config.CACHE_DIR = saved
+        results += measured
+        results.append({"rows": rows, "stage": "process", "rss_peak_mb": _rss_mb()})
+    return {"meta": metadata(args), "results": results}
+
+def compare(new: dict, old: dict, max_ratio: float | None) -> bool:
+    """Print new/old median per (rows, stage); False when a ratio exceeds max_ratio."""
+    before = {(r["rows"], r["stage"]): r for r in old["results"] if "median_s" in r}
+    ok = True
+    print(f"\nvs {old['meta'].get('git_rev')} ({old['meta'].get('timestamp')})")
+    for r in new["results"]:
+        b = before.get((r["rows"], r["stage"]))
+        if b is None or "median_s" not in r or not b["median_s"]:
+            continue
+        ratio = r["median_s"] / b["median_s"]
+        flag = ""
+        if max_ratio and ratio > max_ratio:
+            ok, flag = False, "  REGRESSION"
+        print(f"{_label(r['rows']):>5} {r['stage']:<22} {b['median_s'] * 1000:10.1f} -> "
+              f"{r['median_s'] * 1000:10.1f} ms  x{ratio:5.2f}{flag}")
+    return ok
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--rows", type=parse_rows, default=parse_rows("10k,1M,10M"),
+                    help="comma-separated sizes, k/M suffixes allowed (default 10k,1M,10M)")
+    ap.add_argument("--merchants", type=int, default=2_000)
+    ap.add_argument("--categories", type=int, default=12)
+    ap.add_argument("--years", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per stage")
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run of each stage")
+    ap.add_argument("--only", type=lambda s: s.split(","), default=[], help="stages whose name contains one of these")
+    ap.add_argument("--skip", type=lambda s: s.split(","), default=[], help="stages whose name contains one of these")
+    ap.add_argument("--data-dir", type=Path, default=ROOT / "data", help="generated CSVs (reused across runs)")
+    ap.add_argument("-o", "--out", type=Path, default=None,
+                    help="JSON results (default benchmarks/results/<timestamp>.json)")
+    ap.add_argument("--baseline", type=Path, default=None, help="earlier JSON results to compare against")
+    ap.add_argument("--max-ratio", type=float, default=None,
+                    help="with --baseline, exit 1 when a stage is this many times slower")
+    args = ap.parse_args(argv)
+
+    warnings.filterwarnings("ignore")       # statsmodels convergence chatter drowns the table
+    report = run(args)
+    out = args.out or ROOT / "results" / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"wrote {out}")
+    if args.baseline:
+        return 0 if compare(report, json.loads(args.baseline.read_text()), args.max_ratio) else 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
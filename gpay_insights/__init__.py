@@ -1,8 +1,10 @@
 from pathlib import Path
 from flask import Flask
 import dash
-from . import config
-from .data_loader import load_data_context
+from . import config, metrics, warmup
+from .background import make_manager
+from .categorize import Categorizer
+from .datasource import DataSource
 from .layouts.base import apply_index_string
 from .layouts.dashboard import build_layout
 from .callbacks.sync import register_sync_callbacks
@@ -13,9 +15,12 @@ from .callbacks.downloads import register_download_callbacks
 def create_app(data_path: Path | None = None):
     server = Flask(__name__)
 
-    # load + attach data context once
-    ctx = load_data_context(data_path or config.DATA_FILE)
-    server.config["DATACTX"] = ctx
+    # load once, then pick up new/appended exports in the background (see datasource)
+    categorizer = Categorizer.from_csv(config.CATEGORY_CSV) if config.RECATEGORIZE else None
+    source = DataSource(data_path or config.DATA_FILE, categorizer=categorizer)
+    server.config["DATASOURCE"] = source
+    metrics.install(server, source)           # callback timings, /metrics (see metrics.py)
+    server.before_request(source.ensure_watcher)   # reloads run on a watcher thread, not in requests
 
     dash_app = dash.Dash(
         __name__,
@@ -26,12 +31,14 @@ def create_app(data_path: Path | None = None):
     )
 
     apply_index_string(dash_app)              # header/nav/footer
-    dash_app.layout = build_layout(ctx)       # components
+    dash_app.layout = lambda: build_layout(source.ctx)   # components, rebuilt per page load
 
     # callbacks
-    register_sync_callbacks(dash_app, ctx)
-    register_main_callbacks(dash_app, ctx)
-    register_merchant_callbacks(dash_app, ctx)
-    register_download_callbacks(dash_app, ctx)
+    register_sync_callbacks(dash_app, source)
+    warm_main = register_main_callbacks(dash_app, source, make_manager(source))
+    register_merchant_callbacks(dash_app, source)
+    register_download_callbacks(dash_app, source)
+
+    warmup.install(server, source, [warm_main])    # first views precomputed after fork (see warmup.py)
 
     return server, dash_app
@@ -0,0 +1,74 @@
+# gpay_insights/background.py
+"""
+Heavy panels (forecast, RFM, treemap) as Dash background callbacks.
+
+With diskcache installed (plus multiprocess and psutil, which Dash's DiskcacheManager needs)
+and config.BACKGROUND_CALLBACKS on, the callbacks of config.BACKGROUND_PANELS run as jobs in
+a child process of the worker: the request returns at once, fast panels render meanwhile,
+and the panel's "<name>-status" text says it is still working. Re-triggering a panel (a new
+date range) cancels its running job. Results are cached on disk by input values and data
+version, so a repeated range or a second page load is answered at the first poll.
+
+Jobs run in a forked child, so what they put in the memo caches stays there. A result the
+worker needs afterwards (the RFM frame its table pages through) goes through shared_result(),
+which keeps it in the manager's disk cache.
+
+Without those packages the same callbacks simply run in the request, as before.
+"""
+from __future__ import annotations
+import logging
+
+from dash import Output
+
+from . import config
+
+try:
+    import diskcache
+    import multiprocess  # noqa: F401  (DiskcacheManager runs jobs with it)
+    import psutil  # noqa: F401
+    from dash import DiskcacheManager
+    HAS_DISKCACHE = True
+except ImportError:
+    HAS_DISKCACHE = False
+
+logger = logging.getLogger(__name__)
+
+# what a panel's status line shows while its job runs
+STATUS_TEXT = {
+    "forecast": "Fitting forecast models…",
+    "rfm": "Computing RFM scores…",
+    "treemap": "Building treemap…",
+}
+
+def make_manager(source):
+    """DiskcacheManager keyed on the data version, or None when background callbacks are off/unavailable."""
+    if not config.BACKGROUND_CALLBACKS:
+        return None
+    if not HAS_DISKCACHE:
+        logger.info("diskcache not installed: heavy panels run in the request")
+        return None
+    cache = diskcache.Cache(str(config.BACKGROUND_CACHE_DIR))
+    return DiskcacheManager(cache, cache_by=[lambda: source.ctx.version], expire=config.BACKGROUND_EXPIRE_S)
+
+_MISSING = object()
+
+def shared_result(manager, key: tuple, compute):
+    """compute() stored in the manager's disk cache under key, for every process to read (plain compute() without one)."""
+    if manager is None:
+        return compute()
+    key = ("gpay", *key)
+    value = manager.handle.get(key, default=_MISSING)
+    if value is _MISSING:
+        value = compute()
+        manager.handle.set(key, value, expire=config.BACKGROUND_EXPIRE_S)
+    return value
+
+def background(manager, panel: str) -> dict:
+    """app.callback keyword arguments running panel's callback as a background job (none without one)."""
+    if manager is None or panel not in config.BACKGROUND_PANELS:
+        return {}
+    return {
+        "background": True,
+        "manager": manager,
+        "running": [(Output(f"{panel}-status", "children"), STATUS_TEXT[panel], "")],
+    }
@@ -1,7 +1,12 @@
-from dash import Input, Output
+from dash import Input, Output, callback_context, html
+from dash.exceptions import PreventUpdate
 import numpy as np
 from .. import config
-from ..utils.filters import apply_filters, apply_completed_only
+from ..background import background, shared_result
+from ..metrics import timed
+from ..utils.filters import date_range_of, filtered_frames
+from ..utils.memo import FRAMES, cached_figure, cached_payload
+from ..utils.tables import apply_table_query, page_records
 from ..utils.formatting import indian_number, fmt_currency_indian
 from ..figures.time_series import monthly_spend_figure, cumulative_spend_figure
 from ..figures.categories import top_categories_figure
@@ -9,131 +14,242 @@ from ..figures.heatmap import heatmap_figure
 from ..figures.merchants import merchant_pareto_figure
 from ..figures.treemap import treemap_figure
 from ..figures.status import status_bar_figure
-from ..figures.forecast import forecast_figure
-from ..rfm import compute_rfm
+from ..figures.forecast import cached_forecast
+from ..cube import COUNT_COL
 from ..figures.flow_pie import flow_pie_figure
-from ..figures.txn_count import monthly_txn_count_figure  # <-- make sure this import exists
+from ..figures.txn_count import monthly_txn_count_figure
 from ..figures.instruments import instruments_donut_figure
 
+# also the whole tbl_rfm.data record: only these fields are sent (page_records(columns=)), the
+# frame's last_date / recency_days stay on the server; last_date_str shows the former
+RFM_COLUMNS = [
+    {"name":"Merchant","id":"merchant"},
+    {"name":"R","id":"R"},
+    {"name":"F","id":"F"},
+    {"name":"M","id":"M"},
+    {"name":"RFM Score","id":"RFM_Score"},
+    {"name":"Last Transaction","id":"last_date_str"},
+    {"name":"Frequency","id":"frequency"},
+    {"name":"Monetary (₹)","id":"monetary"},
+]
 
+def _card(label, value, sub=None):
+    return {"label": label, "value": value, "sub": sub}
+
+def _render_card(d):
+    return html.Div([
+        html.Div(d["label"], style={"fontSize":"12px","color":"#555","marginBottom":"4px"}),
+        html.Div(d["value"], style={"fontSize":"22px","fontWeight":700}),
+        html.Div(d.get("sub") or "", style={"fontSize":"11px","color":"#888","marginTop":"4px"}),
+    ], style=config.CARD_STYLE)
+
+@timed("kpi_cards")
+def kpi_cards(datactx, dff_c, cube_c):
+    """KPI card dicts (Completed only); sums/counts from the cube, median from raw rows."""
+    total_money = float(cube_c.loc[cube_c["_flow"].isin(["Outflow", "Inflow"]), datactx.amt_col].sum()) if not cube_c.empty else 0.0
+    total_out = float(cube_c.loc[cube_c["_flow"] == "Outflow", datactx.amt_col].sum()) if not cube_c.empty else 0.0
+    total_in  = float(cube_c.loc[cube_c["_flow"] == "Inflow", datactx.amt_col].sum()) if not cube_c.empty else 0.0
+    n_txn = int(cube_c[COUNT_COL].sum())
+    median_amt = float(dff_c[datactx.amt_col].median()) if not dff_c.empty else np.nan
+    mean_amt   = float(cube_c[datactx.amt_col].sum() / n_txn) if n_txn else np.nan
+
+    top10_share = np.nan
+    if datactx.merchant_col and not cube_c.empty:
+        out_by_merch = (cube_c.loc[cube_c["_flow"] == "Outflow"]
+                            .groupby(datactx.merchant_col, observed=True)[datactx.amt_col].sum()
+                            .sort_values(ascending=False))
+        tot_out = float(out_by_merch.sum()) if len(out_by_merch) else 0.0
+        if tot_out > 0:
+            top10_share = float(out_by_merch.head(10).sum() / tot_out) * 100.0
+
+    return [
+        _card("Total Money Transacted", fmt_currency_indian(total_money), "Completed • Inflow + Outflow"),
+        _card("Total Outflow", fmt_currency_indian(total_out)),
+        _card("Total Inflow", fmt_currency_indian(total_in)),
+        _card("Median txn", fmt_currency_indian(median_amt)),
+        _card("Mean txn", fmt_currency_indian(mean_amt)),
+        _card("# Transactions", indian_number(n_txn)),
+        _card("# Active merchants", indian_number(cube_c[datactx.merchant_col].nunique()) if datactx.merchant_col and not cube_c.empty else "—"),
+        _card("Top-10 merchant share", f"{top10_share:.1f}%" if not np.isnan(top10_share) else "—"),
+    ]
+
+
+def register_main_callbacks(app, source, manager=None):
+    """
+    One callback per panel, each triggered only by the inputs it uses, so a local control
+    (pie metric, heatmap metric, Top-N) re-renders just its own chart. Filtered frames and
+    figure JSON are memoized per (data version, date range, options) in utils.memo.
+    Each call works on the source.ctx it read first, even if a reload swaps it meanwhile.
+    With a background manager the heavy panels run as jobs (see background.py).
+    Returns warm(flt), which fills those caches for a filter state as a first page load
+    with default panel options would (see warmup.py).
+    """
+    def frames(datactx, flt):
+        return filtered_frames(datactx, *date_range_of(flt, datactx))
+
+    def key(datactx, flt, *parts):
+        return (datactx.version, *date_range_of(flt, datactx), *parts)
 
-def register_main_callbacks(app, datactx):
     @app.callback(
         Output("kpi-row", "children"),
+        Input("filters-store", "data"),
+    )
+    def update_kpis(flt):
+        datactx = source.ctx
+        def build():
+            _, dff_c, cube_c = frames(datactx, flt)
+            return kpi_cards(datactx, dff_c, cube_c)
+        return [_render_card(c) for c in cached_payload(key(datactx, flt, "kpis"), build)]
+
+    @app.callback(
         Output("fig_ts", "figure"),
         Output("fig_cum", "figure"),
+        Input("filters-store", "data"),
+    )
+    def update_overview(flt):
+        datactx = source.ctx
+        return (cached_figure(key(datactx, flt, "fig_ts"),
+                              lambda: monthly_spend_figure(frames(datactx, flt)[2], datactx.date_col, datactx.amt_col)),
+                cached_figure(key(datactx, flt, "fig_cum"),
+                              lambda: cumulative_spend_figure(frames(datactx, flt)[2], datactx.amt_col)))
+
+    @app.callback(
         Output("fig_cat", "figure"),
+        Output("fig_txn_count", "figure"),
+        Output("fig_instr_donut", "figure"),
+        Input("filters-store", "data"),
+    )
+    def update_categories(flt):
+        datactx = source.ctx
+        return (cached_figure(key(datactx, flt, "fig_cat"),
+                              lambda: top_categories_figure(frames(datactx, flt)[2], datactx.cat_col, datactx.amt_col)),
+                cached_figure(key(datactx, flt, "fig_txn_count"),
+                              lambda: monthly_txn_count_figure(frames(datactx, flt)[1], datactx.date_col)),
+                cached_figure(key(datactx, flt, "fig_instr_donut"),
+                              lambda: instruments_donut_figure(frames(datactx, flt)[2], datactx.instr_col, datactx.amt_col)))
+
+    @app.callback(
         Output("fig_flow_pie", "figure"),
-        Output("fig_txn_count", "figure"),        # <-- NEW in outputs (matches layout)
-        Output("fig_instr_donut", "figure"),  # NEW
+        Input("filters-store", "data"),
+        Input("flow-pie-metric", "value"),
+    )
+    def update_flow_pie(flt, pie_metric):
+        datactx = source.ctx
+        metric = pie_metric or "amount"
+        return cached_figure(key(datactx, flt, "fig_flow_pie", metric),
+                             lambda: flow_pie_figure(frames(datactx, flt)[1], datactx.tx_col, datactx.amt_col, metric=metric))
+
+    @app.callback(
         Output("fig_cal", "figure"),
+        Input("filters-store", "data"),
+        Input("heatmap-metric-local", "value"),
+    )
+    def update_heatmap(flt, heat_metric):
+        datactx = source.ctx
+        metric = heat_metric or "count"
+        return cached_figure(key(datactx, flt, "fig_cal", metric),
+                             lambda: heatmap_figure(frames(datactx, flt)[2], datactx.amt_col, metric=metric))
+
+    @app.callback(
         Output("fig_merch_pareto", "figure"),
+        Input("filters-store", "data"),
+        Input("opt-topn-local", "value"),
+    )
+    def update_pareto(flt, topn):
+        datactx = source.ctx
+        topn = int(topn or 25)
+        return cached_figure(key(datactx, flt, "fig_merch_pareto", topn),
+                             lambda: merchant_pareto_figure(frames(datactx, flt)[2], datactx.merchant_col, datactx.amt_col, topn))
+
+    @app.callback(
         Output("treemap-total", "children"),
         Output("fig_treemap", "figure"),
+        Input("filters-store", "data"),
+        **background(manager, "treemap"),
+    )
+    def update_treemap(flt):
+        datactx = source.ctx
+        def total_text():
+            cube_c = frames(datactx, flt)[2]
+            # Treemap total text (Completed Outflow)
+            tot_outflow = float(cube_c.loc[cube_c["_flow"] == "Outflow", datactx.amt_col].sum()) if not cube_c.empty else 0.0
+            return f"Total (Completed Outflow): {fmt_currency_indian(tot_outflow)}"
+        return (cached_payload(key(datactx, flt, "treemap-total"), total_text),
+                cached_figure(key(datactx, flt, "fig_treemap"),
+                              lambda: treemap_figure(frames(datactx, flt)[2], datactx.cat_col, datactx.merchant_col, datactx.amt_col)))
+
+    @app.callback(
         Output("fig_status_bar", "figure"),
+        Input("filters-store", "data"),
+    )
+    def update_status(flt):
+        datactx = source.ctx
+        # Status bar uses raw dff (group by status), but still filtered by date/year
+        return cached_figure(key(datactx, flt, "fig_status_bar"),
+                             lambda: status_bar_figure(frames(datactx, flt)[0], datactx.status_col or "status", datactx.amt_col))
+
+    # RFM in two steps: computing the frame of a range is the (background) job, paging,
+    # sorting and filtering it is a plain callback on the worker, which reads the job's
+    # frame back through the manager's disk cache
+    @app.callback(
+        Output("rfm-store", "data"),
+        Input("filters-store", "data"),
+        **background(manager, "rfm"),
+    )
+    def update_rfm_frame(flt):
+        rfm_frame(source.ctx, flt)
+        return flt
+
+    @app.callback(
         Output("tbl_rfm", "columns"),
         Output("tbl_rfm", "data"),
+        Output("tbl_rfm", "page_count"),
+        Output("tbl_rfm", "page_current"),
+        Input("rfm-store", "data"),
+        Input("tbl_rfm", "page_current"),
+        Input("tbl_rfm", "page_size"),
+        Input("tbl_rfm", "sort_by"),
+        Input("tbl_rfm", "filter_query"),
+    )
+    def update_rfm(flt, page_current, page_size, sort_by, filter_query):
+        if flt is None:
+            raise PreventUpdate     # frame not computed yet
+        view = rfm_view(source.ctx, flt, filter_query, sort_by)
+        if callback_context.triggered_id == "rfm-store":
+            page_current = 0
+        data, page, page_count = page_records(view, page_current, page_size, [c["id"] for c in RFM_COLUMNS])
+        return RFM_COLUMNS, data, page_count, page
+
+    @app.callback(
         Output("fig_forecast", "figure"),
-        Input("filters-store", "data"),
-        Input("flow-pie-metric", "value"),
-        Input("heatmap-metric-local", "value"),
-        Input("opt-topn-local", "value"),
+        Input("fig_forecast", "id"),
+        **background(manager, "forecast"),
     )
-    def rebuild_main(flt, pie_metric, heat_metric, topn):
-        # ---- filter data ----
-        s = flt.get("start", str(datactx.min_date))
-        e = flt.get("end", str(datactx.max_date))
-        dff = apply_filters(datactx.df, datactx.date_col, s, e)
-        dff_c = apply_completed_only(dff, datactx.status_col)
-
-        # ---- KPIs (Completed only) ----
-        total_money = float(dff_c.loc[dff_c["_flow"].isin(["Outflow", "Inflow"]), datactx.amt_col].sum()) if not dff_c.empty else 0.0
-        total_out = float(dff_c.loc[dff_c["_flow"] == "Outflow", datactx.amt_col].sum()) if not dff_c.empty else 0.0
-        total_in  = float(dff_c.loc[dff_c["_flow"] == "Inflow", datactx.amt_col].sum()) if not dff_c.empty else 0.0
-        median_amt = float(dff_c[datactx.amt_col].median()) if not dff_c.empty else np.nan
-        mean_amt   = float(dff_c[datactx.amt_col].mean()) if not dff_c.empty else np.nan
-
-        top10_share = np.nan
-        if datactx.merchant_col and not dff_c.empty:
-            out_by_merch = (dff_c.loc[dff_c["_flow"] == "Outflow"]
-                                .groupby(datactx.merchant_col)[datactx.amt_col].sum()
-                                .sort_values(ascending=False))
-            tot_out = float(out_by_merch.sum()) if len(out_by_merch) else 0.0
-            if tot_out > 0:
-                top10_share = float(out_by_merch.head(10).sum() / tot_out) * 100.0
-
-        def _card(label, value, sub=None):
-            return {"label": label, "value": value, "sub": sub}
-
-        def _render_card(d):
-            from dash import html
-            return html.Div([
-                html.Div(d["label"], style={"fontSize":"12px","color":"#555","marginBottom":"4px"}),
-                html.Div(d["value"], style={"fontSize":"22px","fontWeight":700}),
-                html.Div(d.get("sub") or "", style={"fontSize":"11px","color":"#888","marginTop":"4px"}),
-            ], style=config.CARD_STYLE)
-
-        kpi_cards = [
-            _card("Total Money Transacted", fmt_currency_indian(total_money), "Completed • Inflow + Outflow"),
-            _card("Total Outflow", fmt_currency_indian(total_out)),
-            _card("Total Inflow", fmt_currency_indian(total_in)),
-            _card("Median txn", fmt_currency_indian(median_amt)),
-            _card("Mean txn", fmt_currency_indian(mean_amt)),
-            _card("# Transactions", indian_number(len(dff_c))),
-            _card("# Active merchants", indian_number(dff_c[datactx.merchant_col].nunique()) if datactx.merchant_col and not dff_c.empty else "—"),
-            _card("Top-10 merchant share", f"{top10_share:.1f}%" if not np.isnan(top10_share) else "—"),
-        ]
-
-        # ---- figures (Completed only where applicable) ----
-        fig_ts   = monthly_spend_figure(dff_c, datactx.date_col, datactx.amt_col)
-        fig_cum  = cumulative_spend_figure(dff_c, datactx.amt_col)
-        fig_cat  = top_categories_figure(dff_c, datactx.cat_col, datactx.amt_col)
-        fig_flow = flow_pie_figure(dff_c, datactx.tx_col, datactx.amt_col, metric=pie_metric or "amount")
-        fig_txn_count = monthly_txn_count_figure(dff_c, datactx.date_col)  # <-- NEW
-        fig_cal  = heatmap_figure(dff_c, datactx.amt_col, metric=heat_metric or "count")
-        fig_m    = merchant_pareto_figure(dff_c, datactx.merchant_col, datactx.amt_col, topn or 25)
-        fig_tree = treemap_figure(dff_c, datactx.cat_col, datactx.merchant_col, datactx.amt_col)
-        fig_instr = instruments_donut_figure(dff_c, datactx.instr_col, datactx.amt_col)
-
-        # Treemap total text (Completed Outflow)
-        tot_outflow = float(dff_c.loc[dff_c["_flow"] == "Outflow", datactx.amt_col].sum()) if not dff_c.empty else 0.0
-        treemap_total_text = f"Total (Completed Outflow): {fmt_currency_indian(tot_outflow)}"
+    def update_forecast(_):
+        datactx = source.ctx
+        # trained on full history, not filtered: only needs to render once per page load
+        return cached_figure((datactx.version, "fig_forecast"), lambda: cached_forecast(datactx)[0])
 
-        # Status bar uses raw dff (group by status), but still filtered by date/year
-        fig_stat = status_bar_figure(dff, datactx.status_col, datactx.amt_col) if datactx.status_col \
-                   else status_bar_figure(dff, "status", datactx.amt_col)
-
-        # RFM table
-        rfm = compute_rfm(dff_c, datactx.merchant_col, datactx.date_col, datactx.amt_col)
-        rfm_cols = [
-            {"name":"Merchant","id":"merchant"},
-            {"name":"R","id":"R"},
-            {"name":"F","id":"F"},
-            {"name":"M","id":"M"},
-            {"name":"RFM Score","id":"RFM_Score"},
-            {"name":"Last Transaction","id":"last_date_str"},
-            {"name":"Frequency","id":"frequency"},
-            {"name":"Monetary (₹)","id":"monetary"},
-        ]
-        rfm_data = rfm.to_dict("records")
-
-        # Forecast (trained on full history, not filtered)
-        fig_fc, _ = forecast_figure(datactx.df, datactx.date_col, datactx.amt_col, status_col=datactx.status_col)
-
-        return (
-            [_render_card(c) for c in kpi_cards],
-            fig_ts,
-            fig_cum,
-            fig_cat,
-            fig_flow,
-            fig_txn_count,     # <-- keep the order in sync with Outputs
-            fig_instr,
-            fig_cal,
-            fig_m,
-            treemap_total_text,
-            fig_tree,
-            fig_stat,
-            rfm_cols,
-            rfm_data,
-            fig_fc,
-        )
+    def rfm_frame(datactx, flt):
+        k = key(datactx, flt, "rfm")
+        return FRAMES.get_or_compute(k, lambda: shared_result(manager, k, lambda: datactx.rfm(*date_range_of(flt, datactx))))
+
+    def rfm_view(datactx, flt, filter_query, sort_by):
+        # full RFM frame per range, then the filtered/sorted view per table query; only one page is sent
+        rfm = rfm_frame(datactx, flt)
+        return FRAMES.get_or_compute(key(datactx, flt, "rfm", filter_query or "", repr(sort_by or [])),
+                                     lambda: apply_table_query(rfm, filter_query, sort_by))
+
+    def warm(flt):
+        update_kpis(flt)
+        update_overview(flt)
+        update_categories(flt)
+        update_flow_pie(flt, None)
+        update_heatmap(flt, None)
+        update_pareto(flt, None)
+        update_treemap(flt)
+        update_status(flt)
+        rfm_view(source.ctx, flt, None, None)
+        update_forecast(None)
+
+    return warm
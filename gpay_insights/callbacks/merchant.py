@@ -1,29 +1,65 @@
-from dash import Input, Output
+from dash import Input, Output, State, callback_context
 from .. import config
-from ..utils.filters import apply_filters, apply_completed_only
+from ..metrics import timed
+from ..utils.filters import date_range_of
 from ..utils.formatting import fmt_currency_indian, indian_number
+from ..utils.memo import FRAMES, cached_payload
+from ..utils.tables import apply_table_query, page_records
+
+def register_merchant_callbacks(app, source):
+    def _selection(datactx, flt, merchant_val):
+        """(rows of the merchant in range, newest first, table columns only; Completed rows) - memoized."""
+        s, e = date_range_of(flt, datactx)
+        @timed("merchant_selection")
+        def build():
+            # merchant index: the merchant's rows in range without scanning the frame
+            df = datactx.df
+            pos = datactx.merchant_rows(merchant_val, s, e)     # ascending dates
+            dsel_c = df.iloc[pos[df["_completed"].to_numpy()[pos]]]
+
+            prefer_cols = [datactx.date_col, datactx.amt_col]
+            for c in (datactx.cat_col, datactx.merchant_col, datactx.status_col, datactx.instr_col, "_flow"):
+                if c and c in df.columns: prefer_cols.append(c)
+            for extra in ["description","details","note","label"]:
+                if extra in df.columns and extra not in prefer_cols: prefer_cols.append(extra)
+
+            seen = set()
+            show_cols = [c for c in prefer_cols if not (c in seen or seen.add(c)) and c in df.columns]
+            return df.iloc[pos[::-1], df.columns.get_indexer(show_cols)], dsel_c
+        return FRAMES.get_or_compute((datactx.version, s, e, "merchant", str(merchant_val)), build)
+
+    @app.callback(
+        Output("merchant-search", "options"),
+        Input("merchant-search", "search_value"),
+        Input("filters-store", "data"),
+        State("merchant-search", "value"),
+    )
+    def merchant_options(search_value, flt, selected):
+        # typeahead: top merchants of the range matching what is typed, not every merchant
+        datactx = source.ctx
+        s, e = date_range_of(flt, datactx)
+        query = (search_value or "").strip().lower()
+        def build():
+            names = datactx.merchant_search(query, s, e, config.MERCHANT_SEARCH_LIMIT)
+            return [{"label": m, "value": m} for m in names]
+        opts = cached_payload((datactx.version, s, e, "merchant-search", query), build)
+        if selected and all(o["value"] != selected for o in opts):
+            opts = [{"label": str(selected), "value": selected}, *opts]     # keep the pick displayable
+        return opts
 
-def register_merchant_callbacks(app, datactx):
     @app.callback(
         Output("merchant-rfm-cards", "children"),
         Output("tbl_merchant_tx", "columns"),
-        Output("tbl_merchant_tx", "data"),
         Input("filters-store", "data"),
         Input("merchant-search", "value"),
     )
     def merchant_explorer(flt, merchant_val):
-        from dash import html
+        datactx = source.ctx
         if not merchant_val or datactx.merchant_col is None:
-            return [], [], []
+            return [], []
 
-        s = flt.get("start", str(datactx.min_date))
-        e = flt.get("end", str(datactx.max_date))
-        dff = apply_filters(datactx.df, datactx.date_col, s, e)
-
-        dsel_all = dff[dff[datactx.merchant_col].astype(str) == str(merchant_val)].copy()
-        if dsel_all.empty: return [], [], []
-
-        dsel_c = apply_completed_only(dsel_all, datactx.status_col)
+        dsel_all, dsel_c = _selection(datactx, flt, merchant_val)
+        if dsel_all.empty: return [], []
 
         last_dt = dsel_c[datactx.date_col].max()
         freq = len(dsel_c)
@@ -39,18 +75,31 @@ def register_merchant_callbacks(app, datactx):
             _card("Inflow Amount", fmt_currency_indian(float(in_sel[datactx.amt_col].sum()))),
             _card("Last Txn", last_dt.strftime("%Y-%m-%d") if last_dt is not None else "—"),
         ]
+        tbl_cols = [{"name": c, "id": c} for c in dsel_all.columns]
+        return cards, tbl_cols
 
-        prefer_cols = [datactx.date_col, datactx.amt_col]
-        for c in (datactx.cat_col, datactx.merchant_col, datactx.status_col, datactx.instr_col, "_flow"):
-            if c and c in dsel_all.columns: prefer_cols.append(c)
-        for extra in ["description","details","note","label"]:
-            if extra in dsel_all.columns and extra not in prefer_cols: prefer_cols.append(extra)
-
-        seen = set()
-        show_cols = [c for c in prefer_cols if not (c in seen or seen.add(c)) and c in dsel_all.columns]
-        tbl_cols = [{"name": c, "id": c} for c in show_cols]
-        tbl_data = dsel_all[show_cols].sort_values(datactx.date_col, ascending=False).to_dict("records")
-        return cards, tbl_cols, tbl_data
+    @app.callback(
+        Output("tbl_merchant_tx", "data"),
+        Output("tbl_merchant_tx", "page_count"),
+        Output("tbl_merchant_tx", "page_current"),
+        Input("filters-store", "data"),
+        Input("merchant-search", "value"),
+        Input("tbl_merchant_tx", "page_current"),
+        Input("tbl_merchant_tx", "page_size"),
+        Input("tbl_merchant_tx", "sort_by"),
+        Input("tbl_merchant_tx", "filter_query"),
+    )
+    def merchant_tx_page(flt, merchant_val, page_current, page_size, sort_by, filter_query):
+        # only the visible page of the (cached) selection is sent to the browser
+        datactx = source.ctx
+        if not merchant_val or datactx.merchant_col is None:
+            return [], 1, 0
+        dsel_all, _ = _selection(datactx, flt, merchant_val)
+        view = apply_table_query(dsel_all, filter_query, sort_by)
+        if callback_context.triggered_id in ("filters-store", "merchant-search"):
+            page_current = 0
+        data, page, page_count = page_records(view, page_current, page_size)
+        return data, page_count, page
 
     def _card(label, value, sub=None):
         from dash import html
@@ -0,0 +1,155 @@
+# gpay_insights/categorize.py
+"""
+Keyword categorization of counterparties.
+
+A category map (category -> keywords, from a CSV with one column per category) is compiled
+once into an Aho-Corasick automaton, so matching a name costs one pass over its characters
+whatever the size of the keyword list. The result is the notebook's match_category: the
+first category, in column order, with a keyword contained in the lower-cased name.
+Series are categorized per distinct value and the result broadcast through the codes.
+"""
+from __future__ import annotations
+import logging
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .data_loader import DataContext, ROLE_FIELDS, build_context
+from .utils.frames import as_category
+
+logger = logging.getLogger(__name__)
+
+# cat_col given to frames that had no category column
+GUESS_COL = "category_guess"
+
+def load_category_map(path: Path) -> Dict[str, List[str]]:
+    """Category -> keywords (lower-cased, de-duplicated) from a CSV with one column per category."""
+    df = None
+    for enc in ("utf-8", "cp1252", "latin1"):
+        try:
+            df = pd.read_csv(path, dtype=str, encoding=enc).fillna("")
+            break
+        except Exception as e:
+            logger.warning("Failed to load %s with encoding %s: %s", path, enc, e)
+    if df is None:
+        logger.error("Could not load category CSV %s", path)
+        return {}
+
+    category_map: Dict[str, List[str]] = {}
+    for col in df.columns:
+        kws = list(dict.fromkeys(kw for kw in (str(x).strip().lower() for x in df[col]) if kw))
+        if kws:
+            category_map[col] = kws
+    return category_map
+
+class Categorizer:
+    """Aho-Corasick automaton over a category map; match() is memoized per distinct name."""
+
+    def __init__(self, category_map: Dict[str, List[str]]):
+        self.categories = list(category_map)
+        none = len(self.categories)
+        goto: list[dict] = [{}]
+        best = [none]           # lowest category index of a keyword ending at (or suffix of) the node
+        for ci, kws in enumerate(category_map.values()):
+            for kw in kws:
+                node = 0
+                for ch in kw:
+                    nxt = goto[node].get(ch)
+                    if nxt is None:
+                        nxt = len(goto)
+                        goto[node][ch] = nxt
+                        goto.append({})
+                        best.append(none)
+                    node = nxt
+                if node:
+                    best[node] = min(best[node], ci)
+
+        # failure links breadth first, so a node's fail target is final before it is used
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                best[nxt] = min(best[nxt], best[fail[nxt]])
+                queue.append(nxt)
+
+        self._goto, self._fail, self._best, self._none = goto, fail, best, none
+        self._memo: dict[str, int] = {}
+
+    @classmethod
+    def from_csv(cls, path: Path) -> "Categorizer":
+        return cls(load_category_map(path))
+
+    def _index(self, name) -> int:
+        """Category index for name, len(categories) when nothing matches."""
+        if not isinstance(name, str):
+            return self._none
+        text = name.strip().lower()
+        hit = self._memo.get(text)
+        if hit is not None:
+            return hit
+        goto, fail, best = self._goto, self._fail, self._best
+        node, top = 0, self._none
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if best[node] < top:
+                top = best[node]
+                if top == 0:
+                    break
+        self._memo[text] = top
+        return top
+
+    def match(self, name) -> Optional[str]:
+        """First category (in column order) with a keyword contained in name, else None."""
+        i = self._index(name)
+        return self.categories[i] if i < self._none else None
+
+    def categorize(self, values: pd.Series) -> pd.Series:
+        """match() of every value as a categorical Series; each distinct value is matched once."""
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, uniques = pd.factorize(values)
+        lut = np.array([self._index(u) for u in uniques] + [self._none], dtype=np.int64)
+        out = lut[codes]                    # code -1 (NA) picks the trailing "no match"
+        out[out == self._none] = -1
+        return pd.Series(pd.Categorical.from_codes(out, categories=self.categories), index=values.index)
+
+def apply_categories(df: pd.DataFrame, roles: dict, categorizer: Categorizer,
+                     keep_unmatched: bool = False) -> tuple[pd.DataFrame, dict]:
+    """
+    (df with cat_col re-derived from merchant_col, roles); cat_col is GUESS_COL when df had none.
+    With keep_unmatched, rows without a keyword match keep their current category.
+    df itself is not modified.
+    """
+    src = roles["merchant_col"]
+    if src is None:
+        return df, roles
+    cat_col = roles["cat_col"] or GUESS_COL
+    guess = categorizer.categorize(df[src])
+    if keep_unmatched and cat_col in df.columns:
+        old = as_category(df[cat_col])
+        cats = list(guess.cat.categories)
+        cats += [c for c in old.cat.categories if c not in set(cats)]
+        old_codes = old.cat.set_categories(cats).cat.codes.to_numpy()
+        codes = guess.cat.codes.to_numpy()
+        guess = pd.Series(pd.Categorical.from_codes(np.where(codes >= 0, codes, old_codes), categories=cats),
+                          index=df.index)
+    out = df.copy(deep=False)
+    out[cat_col] = guess
+    return out, {**roles, "cat_col": cat_col}
+
+def recategorize(ctx: DataContext, categorizer: Categorizer, keep_unmatched: bool = False) -> DataContext:
+    """ctx with categories re-derived from the counterparty column (cube rebuilt, no re-parse)."""
+    roles = {f: getattr(ctx, f) for f in ROLE_FIELDS}
+    df, roles = apply_categories(ctx.df, roles, categorizer, keep_unmatched)
+    return ctx if df is ctx.df else build_context(df, roles)
@@ -2,9 +2,35 @@
 
 from pathlib import Path
 
-# data file (you can override by passing a Path to create_app)
+# data file, or a directory of exports: CSV, or Parquet from gpay_insights.extract (you can override by passing a Path to create_app)
 DATA_DIR  = Path(__file__).resolve().parents[1] / "data"
 DATA_FILE = DATA_DIR / "Gpay_Transaction_Data.csv"
+DATA_PATTERNS = ("*.csv", "*.parquet")    # files read when DATA_FILE is a directory
+
+# seconds between checks for new/appended exports while serving (0 = load once at startup)
+RELOAD_INTERVAL_S = 30
+# rows with the same value here are one transaction; rows without one are matched on
+# type, amount, currency, counterparty, instrument, account and timestamp instead
+DEDUP_ID_COLUMN = "details_id"
+
+# Takeout HTML extractor (python -m gpay_insights.extract): category keyword CSV and read size
+CATEGORY_CSV = Path(__file__).resolve().parents[1] / "Notebook" / "category_list.csv"
+EXTRACT_CHUNK_BYTES = 1 << 20
+EXTRACT_WORKERS = None    # processes for several exports at once (None = one per CPU, 1 = serial)
+# re-derive the dashboard's categories from CATEGORY_CSV keywords when loading (gpay_insights.categorize)
+RECATEGORIZE = False
+
+# CSV rows parsed + normalized per step when loading (bounds peak memory on big exports)
+CSV_CHUNK_ROWS = 250_000
+
+# columnar cache of the normalized frame (needs pyarrow; silently skipped without it)
+DATA_CACHE = True
+CACHE_DIR  = DATA_DIR / ".cache"
+# key the cache on a content hash as well as size/mtime (slower to check on big files)
+CACHE_HASH_SOURCE = False
+# serve the cache as a read-only memory-mapped Arrow file: gunicorn workers then share one
+# physical copy of the numeric/date columns instead of holding one each (see wsgi.py)
+SHARED_DATA_MMAP = False
 
 # -------------- Styling ---------------
 EXTERNAL_STYLESHEETS = [
@@ -26,6 +52,46 @@ EXCLUDE_CATS = {"unrecognized", "uncategorized", "unknown", "misc", "others", "o
 # Completed status tokens (normalized)
 COMPLETED_TOKENS = {"completed", "success", "succeeded", "successful"}
 
+# SARIMAX grid search (figures/forecast.py)
+SARIMAX_WORKERS      = None   # fits run at once, one child process each; None = one per CPU, 1 = serial in-process
+SARIMAX_FIT_TIMEOUT  = 60     # seconds per candidate fit from its start; slower child fits are terminated
+SARIMAX_PRUNE_DELTA  = None   # e.g. 10.0: skip full fits whose rough AIC is this much worse than the best
+SARIMAX_PRUNE_MAXITER = 15    # optimizer iterations for the rough pruning pass
+
+# RFM (rfm.py): score buckets per R/F/M (5 = quintiles, scores 1..5); above RFM_EXACT_MAX merchants
+# percentile ranks come from a fixed-size sample of RFM_SAMPLE values instead of a full sort
+RFM_BUCKETS   = 5
+RFM_EXACT_MAX = 200_000
+RFM_SAMPLE    = 20_000
+
+# per-worker LRU caches (utils/memo.py): filtered frames and serialized figures/tables
+FRAME_CACHE_ENTRIES   = 32
+FRAME_CACHE_MB        = 512
+PAYLOAD_CACHE_ENTRIES = 512
+PAYLOAD_CACHE_MB      = 128
+SINGLE_FLIGHT_WAIT_S  = 300     # longest wait for another request's computation of the same entry
+
+# forecast / RFM / treemap as Dash background jobs (background.py; needs diskcache, multiprocess, psutil)
+BACKGROUND_CALLBACKS = True
+BACKGROUND_PANELS    = ("forecast", "rfm", "treemap")
+BACKGROUND_CACHE_DIR = CACHE_DIR / "jobs"
+BACKGROUND_EXPIRE_S  = 3600     # seconds a finished panel result is kept for reuse
+
+# warm-up (warmup.py): precompute the full range and every year at startup and after each reload
+WARMUP = True
+
+# Merchant Explorer typeahead: options sent per keystroke (top merchants by spend in the range)
+MERCHANT_SEARCH_LIMIT = 50
+
+# callback latency (metrics.py): Server-Timing headers and Prometheus histograms at METRICS_PATH
+METRICS_ENABLED  = True
+METRICS_PATH     = "/metrics"
+METRICS_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# profile a sample of callback requests: None (off), "cprofile" (.prof) or "pyinstrument" (.html, needs pyinstrument)
+PROFILE        = None
+PROFILE_SAMPLE = 0.05     # fraction of callback requests profiled
+PROFILE_DIR    = DATA_DIR / ".profiles"
+
 # NEW: treemap height = +40%
 TREEMAP_H = int(FIG_H * 1.4)
 
@@ -0,0 +1,44 @@
+import pandas as pd
+
+from .utils.filters import slice_sorted
+from .utils.frames import concat_frames
+
+# count of source rows behind each cube cell (amounts are summed into amt_col itself)
+COUNT_COL = "_n"
+
+def cube_dims(date_col, cat_col, merchant_col, instr_col) -> list[str]:
+    dims = [date_col, "_month", "_flow", "_completed"]
+    dims += [c for c in (cat_col, merchant_col, instr_col) if c]
+    return dims + ["_dow", "_hour"]
+
+def build_cube(df: pd.DataFrame, date_col, amt_col, cat_col=None, merchant_col=None, instr_col=None) -> pd.DataFrame:
+    """
+    Pre-aggregate raw rows to (day, flow, completed, category, merchant, instrument, dow, hour) -> sum/count.
+    Columns keep their raw names, so figure builders that groupby(...)[amt_col].sum() work on a
+    cube slice unchanged; row counts live in COUNT_COL. Sorted by day for slice_sorted.
+    """
+    dims = cube_dims(date_col, cat_col, merchant_col, instr_col)
+    keyed = df[dims[1:] + [amt_col]].assign(**{date_col: df[date_col].dt.normalize(), COUNT_COL: 1})
+    cube = (keyed.groupby(dims, dropna=False, observed=True, sort=False)
+                 .agg(**{amt_col: (amt_col, "sum"), COUNT_COL: (COUNT_COL, "sum")})
+                 .reset_index())
+    return cube.sort_values(date_col, kind="stable").reset_index(drop=True)
+
+def merge_cube(cube: pd.DataFrame, new_cells: pd.DataFrame, date_col: str, amt_col: str) -> pd.DataFrame:
+    """
+    Cube of old + new rows from the two cubes: cells before new_cells' first day are kept as they
+    are, only the days from there on are re-aggregated (appended exports mostly add recent days).
+    """
+    if new_cells.empty:
+        return cube
+    cut = int(cube[date_col].searchsorted(new_cells[date_col].iloc[0], side="left"))
+    dims = [c for c in cube.columns if c not in (amt_col, COUNT_COL)]
+    recent = (concat_frames([cube.iloc[cut:], new_cells])
+                  .groupby(dims, dropna=False, observed=True, sort=False)[[amt_col, COUNT_COL]].sum()
+                  .reset_index()
+                  .sort_values(date_col, kind="stable"))
+    return concat_frames([cube.iloc[:cut], recent])
+
+def cube_slice(cube: pd.DataFrame, date_col: str, start, end, completed_only: bool = True) -> pd.DataFrame:
+    part = slice_sorted(cube, date_col, start, end)
+    return part[part["_completed"]] if completed_only else part
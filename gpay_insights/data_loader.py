@@ -1,3 +1,6 @@
+import codecs
+import hashlib
+import json
 from dataclasses import dataclass
 from datetime import date as _date
 from pathlib import Path
@@ -5,7 +8,13 @@ from typing import Optional, List
 import numpy as np
 import pandas as pd
 
-from . import config
+from . import config, store
+from .utils.filters import slice_sorted, is_completed_series
+from .utils.frames import as_category, concat_frames
+from .cube import build_cube, cube_slice
+from .merchant_index import MerchantIndex
+from .rfm import MerchantPartials, rfm_for_range
+from .utils.classify import FLOW_LABELS, PSR_LABELS, classify_categorical, flow_direction, payment_class
 
 @dataclass
 class DataContext:
@@ -21,6 +30,41 @@ class DataContext:
     months_index: pd.DatetimeIndex
     min_date: _date
     max_date: _date
+    cube: Optional[pd.DataFrame] = None
+    # per-merchant RFM state by day/month (see rfm.MerchantPartials); None without a merchant column
+    merchant_rfm: Optional[MerchantPartials] = None
+    # row positions per merchant (see merchant_index.MerchantIndex); None without a merchant column
+    merchant_index: Optional[MerchantIndex] = None
+    # content fingerprint of df; keys caches of anything derived from the data
+    version: str = ""
+
+    def date_slice(self, start, end) -> pd.DataFrame:
+        """Rows between start and end (inclusive days) as a zero-copy view of df."""
+        return slice_sorted(self.df, self.date_col, start, end)
+
+    def memory_report(self) -> pd.DataFrame:
+        """Resident bytes per column of df (see memory_report)."""
+        return memory_report(self.df)
+
+    def cube_slice(self, start, end, completed_only: bool = True) -> pd.DataFrame:
+        """Pre-aggregated cells (see cube.build_cube) for start..end; Completed only by default."""
+        return cube_slice(self.cube, self.date_col, start, end, completed_only)
+
+    def rfm(self, start, end) -> pd.DataFrame:
+        """compute_rfm of the Completed rows in start..end, merged from merchant_rfm."""
+        return rfm_for_range(self.merchant_rfm, start, end)
+
+    def merchant_rows(self, merchant, start, end) -> np.ndarray:
+        """Positions in df of merchant's rows in start..end, in date order (two binary searches)."""
+        if self.merchant_index is None:
+            return np.empty(0, dtype=np.int64)
+        return self.merchant_index.rows(merchant, start, end)
+
+    def merchant_search(self, query: str, start, end, limit: int) -> list[str]:
+        """Top merchants active in start..end with a word starting with query (see MerchantIndex.search)."""
+        if self.merchant_index is None:
+            return []
+        return self.merchant_index.search(query, start, end, limit)
 
 def _read_csv_robust(path: Path) -> pd.DataFrame:
     for enc in ("utf-8", "utf-8-sig", "cp1252", "latin-1"):
@@ -37,10 +81,32 @@ def first_match(cols: List[str], needles: List[str]):
                 return c
     return None
 
-def load_data_context(csv_path: Path) -> DataContext:
-    df = _read_csv_robust(csv_path)
-    df.columns = [c.strip().lower().replace(" ", "_") for c in df.columns]
+def compact_dtypes(df: pd.DataFrame, dims: list[Optional[str]], max_ratio: float = 0.5) -> pd.DataFrame:
+    """
+    Store text dimensions as categoricals: the given role columns always, any other object
+    column when it has at most max_ratio distinct values per row (free text stays object).
+    """
+    dims = {c for c in dims if c}
+    for c in df.columns:
+        if df[c].dtype != object:
+            continue
+        if c in dims or df[c].nunique(dropna=True) <= max_ratio * len(df):
+            df[c] = df[c].astype("category")
+    return df
 
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Bytes per column (deep, i.e. including string payloads), largest first, with a total row."""
+    mem = df.memory_usage(index=False, deep=True)
+    rep = pd.DataFrame({"dtype": df.dtypes.astype(str), "bytes": mem})
+    rep = rep.sort_values("bytes", ascending=False)
+    rep.loc["(total)"] = ["", int(mem.sum())]
+    return rep
+
+# DataContext fields that name a column of df ("column roles")
+ROLE_FIELDS = ("date_col", "amt_col", "cat_col", "status_col", "instr_col", "merchant_col", "tx_col")
+
+def detect_roles(df: pd.DataFrame) -> dict:
+    """Column roles of a raw export (columns already snake_cased); merchant_col is judged on these rows."""
     date_col   = first_match(df.columns, ["date"])
     amt_col    = first_match(df.columns, ["amount", "amt", "value"])
     cat_col    = first_match(df.columns, ["category"])
@@ -56,6 +122,20 @@ def load_data_context(csv_path: Path) -> DataContext:
     if date_col is None: raise ValueError("No date-like column found.")
     if amt_col  is None: raise ValueError("No amount/amt/value column found.")
 
+    tx_candidates = [c for c in df.columns if "type" in c or "direction" in c or ("transaction" in c and "type" in c)]
+    tx_col = tx_candidates[0] if tx_candidates else None
+
+    return dict(date_col=date_col, amt_col=amt_col, cat_col=cat_col, status_col=status_col,
+                instr_col=instr_col, merchant_col=merchant_col, tx_col=tx_col)
+
+def _snake_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [c.strip().lower().replace(" ", "_") for c in df.columns]
+    return df
+
+def _normalize_rows(df: pd.DataFrame, roles: dict) -> pd.DataFrame:
+    """Parse dates/amounts, drop unusable rows and add the derived columns (row order unchanged)."""
+    date_col, amt_col, tx_col, status_col = roles["date_col"], roles["amt_col"], roles["tx_col"], roles["status_col"]
+
     # parse date to IST
     df[date_col] = pd.to_datetime(df[date_col], errors="coerce", utc=True)
     df[date_col] = df[date_col].dt.tz_convert("Asia/Kolkata").dt.tz_localize(None)
@@ -66,35 +146,148 @@ def load_data_context(csv_path: Path) -> DataContext:
     df[amt_col] = pd.to_numeric(df[amt_col], errors="coerce")
     df = df[df[amt_col].notna()].copy()
 
-    # flow mapping (best-effort)
-    tx_candidates = [c for c in df.columns if "type" in c or "direction" in c or ("transaction" in c and "type" in c)]
-    tx_col = tx_candidates[0] if tx_candidates else None
-    outflow_aliases = {"paid", "sent", "debit", "payment", "purchase", "bill", "charge"}
-    inflow_aliases  = {"received", "credit", "refund", "cashback"}
-
-    def flow_direction(x: str) -> str:
-        s = str(x).lower()
-        if any(a in s for a in outflow_aliases): return "Outflow"
-        if any(a in s for a in inflow_aliases):  return "Inflow"
-        return "Unknown"
-    df["_flow"] = df[tx_col].map(flow_direction) if tx_col else "Unknown"
+    # flow mapping (best-effort): classify each distinct type string once, store as categoricals
+    if tx_col:
+        df[tx_col] = as_category(df[tx_col])
+        df["_flow"] = classify_categorical(df[tx_col], flow_direction, FLOW_LABELS)
+        df["_psr"]  = classify_categorical(df[tx_col], payment_class, PSR_LABELS)
+    else:
+        df["_flow"] = pd.Categorical(["Unknown"] * len(df), categories=FLOW_LABELS)
 
-    # helpers
+    # helpers (_dow: 0 = Monday)
     df["_month"] = df[date_col].dt.to_period("M").dt.to_timestamp()
-    df["_dow"]   = df[date_col].dt.day_name()
-    df["_hour"]  = df[date_col].dt.hour
-    df["_date_only"] = df[date_col].dt.date
+    df["_dow"]   = df[date_col].dt.dayofweek.astype(np.int8)
+    df["_hour"]  = df[date_col].dt.hour.astype(np.int8)
+    df["_completed"] = is_completed_series(df[status_col]).to_numpy() if status_col else True
+    return df
+
+def _role_dims(roles: dict) -> list[Optional[str]]:
+    return [roles["cat_col"], roles["merchant_col"], roles["status_col"], roles["instr_col"]]
+
+def _sort_by_date(df: pd.DataFrame, date_col: str) -> pd.DataFrame:
+    # sort once so date ranges are binary-searchable (see DataContext.date_slice)
+    return df.sort_values(date_col, kind="stable").reset_index(drop=True)
+
+def normalize_frame(df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
+    """Detect column roles and normalize a raw export (dates, amounts, derived helpers, date order)."""
+    df = _snake_columns(df)
+    roles = detect_roles(df)
+    df = compact_dtypes(_normalize_rows(df, roles), _role_dims(roles))
+    return _sort_by_date(df, roles["date_col"]), roles
+
+def sniff_encoding(path: Path, nbytes: int = 1 << 20) -> str:
+    """First encoding that strictly decodes the first nbytes of path (a cut multi-byte tail is fine)."""
+    with open(path, "rb") as f:
+        head = f.read(nbytes)
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    for enc in ("utf-8", "cp1252", "latin-1"):
+        try:
+            codecs.getincrementaldecoder(enc)().decode(head, final=False)
+            return enc
+        except UnicodeDecodeError:
+            continue
+    return "latin-1"
+
+def read_normalized(csv_path, chunksize: int | None = None, encoding: str | None = None,
+                    roles: dict | None = None) -> tuple[pd.DataFrame, dict]:
+    """
+    Streaming equivalent of normalize_frame(_read_csv_robust(csv_path)).
+    The encoding is sniffed from a prefix (undecodable bytes later on are replaced, not retried),
+    the file is read config.CSV_CHUNK_ROWS rows at a time, and each chunk is normalized and
+    compacted to categoricals before the next is read, so peak memory is about one raw chunk
+    plus the compact result. Roles (and which extra text columns become categoricals) are
+    decided on the first chunk unless given. csv_path may also be a binary buffer when
+    encoding is given (used for rows appended to a known file, see datasource).
+    """
+    enc = encoding or sniff_encoding(csv_path)
+    reader = pd.read_csv(csv_path, encoding=enc, encoding_errors="replace",
+                         chunksize=chunksize or config.CSV_CHUNK_ROWS)
+    cat_cols, chunks = None, []
+    for raw in reader:
+        raw = _snake_columns(raw)
+        if roles is None:
+            roles = detect_roles(raw)
+        chunk = _normalize_rows(raw, roles)
+        if cat_cols is None:
+            chunk = compact_dtypes(chunk, _role_dims(roles))
+            cat_cols = [c for c in chunk.columns if isinstance(chunk[c].dtype, pd.CategoricalDtype)]
+        else:
+            for c in cat_cols:
+                chunk[c] = as_category(chunk[c])
+        chunks.append(chunk)
+    if not chunks:
+        raise ValueError(f"Could not read CSV: {csv_path}")
+    return _sort_by_date(concat_frames(chunks), roles["date_col"]), roles
+
+def data_fingerprint(df: pd.DataFrame, roles: dict) -> str:
+    """
+    Stable digest of every column derived results depend on: dates, amounts, the other role
+    columns (category, merchant, instrument, status, type) and the derived flow, type and
+    completion. Text columns hash by value, so category order does not matter.
+    """
+    h = hashlib.blake2b(digest_size=12)
+    h.update(json.dumps(roles, sort_keys=True).encode())
+    h.update(np.ascontiguousarray(df[roles["date_col"]].to_numpy()).view(np.int64).tobytes())
+    h.update(np.ascontiguousarray(df[roles["amt_col"]].to_numpy(dtype=float)).tobytes())
+    others = [roles[f] for f in ROLE_FIELDS if f not in ("date_col", "amt_col") and roles.get(f)]
+    cols = [c for c in dict.fromkeys(["_flow", "_psr", "_completed", *others]) if c in df.columns]
+    h.update(pd.util.hash_pandas_object(df[cols], index=False).to_numpy().tobytes())
+    return h.hexdigest()
 
+def build_context(df: pd.DataFrame, roles: dict, cube: Optional[pd.DataFrame] = None,
+                  version: Optional[str] = None, merchant_rfm: Optional[MerchantPartials] = None,
+                  merchant_index: Optional[MerchantIndex] = None) -> DataContext:
+    """
+    DataContext (date bounds, month axis, aggregate cube, RFM partials, merchant index) from a
+    normalize_frame result. cube, merchant_rfm, merchant_index and version are computed from df
+    unless the caller already has them (incremental reload).
+    """
+    date_col = roles["date_col"]
     min_date = df[date_col].min().date()
     max_date = df[date_col].max().date()
 
     months_index = pd.date_range(min_date, max_date, freq="MS")
     months_list  = [d.date() for d in months_index]
 
+    if cube is None:
+        cube = build_cube(df, date_col, roles["amt_col"], roles["cat_col"], roles["merchant_col"], roles["instr_col"])
+    if merchant_rfm is None and roles["merchant_col"]:
+        merchant_rfm = MerchantPartials.build(df, date_col, roles["amt_col"], roles["merchant_col"])
+    if merchant_index is None and roles["merchant_col"]:
+        merchant_index = MerchantIndex.build(df, roles["merchant_col"], date_col, roles["amt_col"])
+
     return DataContext(
-        df=df,
-        date_col=date_col, amt_col=amt_col, cat_col=cat_col, status_col=status_col,
-        instr_col=instr_col, merchant_col=merchant_col, tx_col=tx_col,
+        df=df, **roles,
         months_list=months_list, months_index=months_index,
-        min_date=min_date, max_date=max_date
+        min_date=min_date, max_date=max_date, cube=cube, merchant_rfm=merchant_rfm, merchant_index=merchant_index,
+        version=version or data_fingerprint(df, roles),
     )
+
+def load_normalized_file(csv_path: Path, use_cache: bool | None = None) -> tuple[pd.DataFrame, dict]:
+    """
+    read_normalized(csv_path) (normalize_frame for a .parquet export), through the columnar cache:
+    with use_cache (default config.DATA_CACHE) the normalized frame and its column roles are
+    persisted under config.CACHE_DIR and reused while the source is unchanged. With config.SHARED_DATA_MMAP the cache is a memory-mapped Arrow file
+    shared by all workers.
+    """
+    use_cache = config.DATA_CACHE if use_cache is None else use_cache
+    fmt = "arrow" if config.SHARED_DATA_MMAP else "parquet"
+    cached = store.load_normalized(csv_path, fmt) if use_cache else None
+    if cached is not None:
+        return cached
+
+    if Path(csv_path).suffix.lower() == ".parquet":
+        df, roles = normalize_frame(pd.read_parquet(csv_path))   # gpay_insights.extract output
+    else:
+        df, roles = read_normalized(csv_path)
+    if use_cache and store.save_normalized(csv_path, df, roles, fmt) and fmt == "arrow":
+        # re-open through the mapping so this process shares pages with the other workers too
+        cached = store.load_normalized(csv_path, fmt)
+        if cached is not None:
+            return cached
+    return df, roles
+
+def load_data_context(csv_path: Path, use_cache: bool | None = None) -> DataContext:
+    """DataContext of a single CSV export (see load_normalized_file; datasource.DataSource for live data)."""
+    return build_context(*load_normalized_file(csv_path, use_cache))
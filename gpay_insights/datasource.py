@@ -0,0 +1,291 @@
+# gpay_insights/datasource.py
+"""
+Live data: a CSV export or a directory of them, kept current while the app is serving.
+
+DataSource loads everything once, then refresh() ingests only what changed since: new files in
+full, rows appended to a known file from its last ingested byte on. New rows already loaded
+(same row_keys) are dropped, the rest are merged into the frame, the cube and the RFM partials
+incrementally and the DataContext is replaced by a single assignment, so a callback that reads
+source.ctx once sees one consistent snapshot. When a file was rewritten rather than appended to, or deleted, all
+files are read again (unchanged ones from the columnar cache). refresh() runs on a watcher
+thread every config.RELOAD_INTERVAL_S seconds, never inside a request; requests keep being
+served from the previous context until the new one is swapped in. Every worker process runs
+its own watcher and refreshes its own copy.
+"""
+import os
+import hashlib
+import io
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import config
+from .categorize import Categorizer, apply_categories, recategorize
+from .cube import build_cube, merge_cube
+from .metrics import timed
+from .rfm import MerchantPartials
+from .data_loader import (DataContext, build_context, data_fingerprint, load_normalized_file,
+                          read_normalized, sniff_encoding, _sort_by_date)
+from .utils.frames import concat_frames
+from .utils.memo import FRAMES, PAYLOADS
+
+logger = logging.getLogger(__name__)
+
+# bytes just before a file's ingested offset, compared to tell an append from a rewrite
+_EDGE_BYTES = 256
+
+@dataclass
+class FileState:
+    size: int
+    mtime_ns: int
+    offset: int         # bytes ingested so far
+    edge: bytes         # the _EDGE_BYTES before offset
+    encoding: str
+
+def list_sources(path: Path) -> list[Path]:
+    """Exports behind path: the file itself, or the config.DATA_PATTERNS matches of a directory."""
+    if path.is_dir():
+        return sorted({p for pat in config.DATA_PATTERNS for p in path.glob(pat) if p.is_file()})
+    return [path] if path.exists() else []
+
+_MIX = np.uint64(0x100000001B3)
+_ID_SALT = np.uint64(0x9E3779B97F4A7C15)
+
+def _text_hash(s: pd.Series, lower: bool) -> tuple[np.ndarray, np.ndarray]:
+    """(hash of the stripped text, non-empty mask); hashed once per category for categoricals."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        cats = pd.Series(s.cat.categories.astype(str)).str.strip()
+        cats = cats.str.lower() if lower else cats
+        codes = s.cat.codes.to_numpy()
+        h = pd.util.hash_array(np.append(cats.to_numpy(dtype=object), ""))
+        filled = np.append(cats.to_numpy(dtype=object) != "", False)
+        return h[codes], filled[codes]        # code -1 (NA) picks the trailing ""
+    txt = s.astype(object).where(s.notna(), "").astype(str).str.strip()
+    txt = txt.str.lower() if lower else txt
+    vals = txt.to_numpy(dtype=object)
+    return pd.util.hash_array(vals), vals != ""
+
+def row_keys(df: pd.DataFrame, roles: dict) -> np.ndarray:
+    """
+    uint64 identity of each row, as the extractor deduplicates: config.DEDUP_ID_COLUMN when set,
+    else type, amount, currency, counterparty, instrument, account and timestamp.
+    """
+    date_col, amt_col = roles["date_col"], roles["amt_col"]
+    key = pd.util.hash_array(df[date_col].to_numpy().view(np.int64))
+    key = key * _MIX ^ pd.util.hash_array(df[amt_col].to_numpy(dtype=float))
+    for c in (roles["tx_col"], "currency", roles["merchant_col"], roles["instr_col"], "account_last4"):
+        if c and c in df.columns:
+            key = key * _MIX ^ _text_hash(df[c], lower=True)[0]
+    if config.DEDUP_ID_COLUMN in df.columns:
+        ids, has_id = _text_hash(df[config.DEDUP_ID_COLUMN], lower=False)
+        key = np.where(has_id, ids ^ _ID_SALT, key)
+    return key
+
+def unseen(keys: np.ndarray, known: np.ndarray) -> np.ndarray:
+    """Mask of keys that are neither in the sorted array known nor repeated earlier in keys."""
+    fresh = ~pd.Index(keys).duplicated()
+    if len(known):
+        pos = np.searchsorted(known, keys).clip(max=len(known) - 1)
+        fresh &= known[pos] != keys
+    return fresh
+
+def _read_edge(f, offset: int) -> bytes:
+    f.seek(max(0, offset - _EDGE_BYTES))
+    return f.read(min(offset, _EDGE_BYTES))
+
+class DataSource:
+    """The DataContext the app serves (.ctx) and the file state needed to update it in place."""
+
+    def __init__(self, path: Path, use_cache: bool | None = None, categorizer: Optional[Categorizer] = None):
+        self.path = Path(path)
+        self.use_cache = use_cache
+        self.categorizer = categorizer
+        self.roles: Optional[dict] = None       # as detected in the files (cat_col may differ in ctx)
+        self._files: dict[str, FileState] = {}
+        self._keys = np.empty(0, dtype=np.uint64)
+        self._lock = threading.Lock()
+        self._watch_lock = threading.Lock()
+        self._watcher_pid: Optional[int] = None     # process whose watcher thread is running
+        self.on_swap: list[Callable[[DataContext], None]] = []     # called with each new context (see warmup)
+        self.ctx: DataContext = self._rebuild(self._read_all(list_sources(self.path)))
+
+    # ---- reading ----
+    def _track(self, p: Path, st, offset: int, encoding: str) -> None:
+        with open(p, "rb") as f:
+            edge = _read_edge(f, offset)
+        self._files[p.name] = FileState(st.st_size, st.st_mtime_ns, offset, edge, encoding)
+
+    def _read_file(self, p: Path) -> Optional[pd.DataFrame]:
+        st = p.stat()
+        try:
+            df, roles = load_normalized_file(p, self.use_cache)
+        except (ValueError, OSError) as e:
+            logger.warning("skipping %s: %s", p, e)
+            df, roles = None, None
+        if roles is not None and self.roles is not None and roles != self.roles:
+            logger.warning("skipping %s: column roles %s differ from %s", p, roles, self.roles)
+            df = None
+        self._track(p, st, st.st_size, sniff_encoding(p) if p.suffix.lower() == ".csv" else "")
+        if df is None:
+            return None
+        self.roles = self.roles or roles
+        return df
+
+    def _read_all(self, files: list[Path]) -> list[pd.DataFrame]:
+        return [df for df in map(self._read_file, files) if df is not None]
+
+    def _read_tail(self, p: Path, state: FileState) -> Optional[pd.DataFrame]:
+        """Complete lines appended to p since state.offset, parsed under the file's own header."""
+        st = p.stat()
+        with open(p, "rb") as f:
+            header = f.readline()
+            f.seek(state.offset)
+            tail = f.read(st.st_size - state.offset)
+        end = tail.rfind(b"\n") + 1
+        if not end:
+            return None         # no complete line yet
+        self._track(p, st, state.offset + end, state.encoding)
+        try:
+            df, _ = read_normalized(io.BytesIO(header + tail[:end]), encoding=state.encoding, roles=self.roles)
+        except ValueError:
+            return None         # blank lines only
+        return df
+
+    def _is_append(self, p: Path, state: FileState, size: int) -> bool:
+        if size <= state.offset or p.suffix.lower() != ".csv":
+            return False
+        with open(p, "rb") as f:
+            return _read_edge(f, state.offset) == state.edge
+
+    # ---- merging ----
+    def _rebuild(self, frames: list[pd.DataFrame]) -> DataContext:
+        """Context from scratch: frames concatenated, deduplicated, sorted; cube and version recomputed."""
+        if not frames:
+            raise FileNotFoundError(f"No readable CSV data at {self.path}")
+        df = frames[0] if len(frames) == 1 else _sort_by_date(concat_frames(frames), self.roles["date_col"])
+        keys = row_keys(df, self.roles)
+        keep = unseen(keys, np.empty(0, dtype=np.uint64))
+        if not keep.all():
+            df, keys = df[keep].reset_index(drop=True), keys[keep]
+        self._keys = np.sort(keys)
+        return build_context(*self._categorized(df))
+
+    def _categorized(self, df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
+        if self.categorizer is None:
+            return df, self.roles
+        return apply_categories(df, self.roles, self.categorizer)
+
+    def _append(self, frames: list[pd.DataFrame]) -> Optional[DataContext]:
+        """Current context plus the rows of frames not loaded yet; None when there are none."""
+        ctx = self.ctx
+        date_col = self.roles["date_col"]
+        new = _sort_by_date(concat_frames(frames), date_col)
+        keys = row_keys(new, self.roles)
+        keep = unseen(keys, self._keys)
+        if not keep.any():
+            return None
+        new, roles = self._categorized(new[keep].reset_index(drop=True))
+        keys = keys[keep]
+
+        df = concat_frames([ctx.df, new])
+        merchant_index = None
+        if new[date_col].iloc[0] < ctx.df[date_col].iloc[-1]:
+            df = _sort_by_date(df, date_col)        # back-dated rows; otherwise already in order
+        elif ctx.merchant_index is not None:
+            merchant_index = ctx.merchant_index.extend(df, roles["merchant_col"], date_col, roles["amt_col"],
+                                                       len(ctx.df))
+        cube = merge_cube(ctx.cube, build_cube(new, date_col, roles["amt_col"], roles["cat_col"],
+                                               roles["merchant_col"], roles["instr_col"]),
+                          date_col, roles["amt_col"])
+        merchant_rfm = None
+        if ctx.merchant_rfm is not None:
+            merchant_rfm = ctx.merchant_rfm.merge(
+                MerchantPartials.build(new, date_col, roles["amt_col"], roles["merchant_col"]))
+        version = hashlib.blake2b((ctx.version + data_fingerprint(new, roles)).encode(), digest_size=12).hexdigest()
+        self._keys = np.sort(np.concatenate([self._keys, keys]))
+        return build_context(df, roles, cube=cube, version=version, merchant_rfm=merchant_rfm,
+                             merchant_index=merchant_index)
+
+    # ---- refreshing ----
+    def set_categorizer(self, categorizer: Optional[Categorizer]) -> None:
+        """Re-derive categories of the loaded rows and of rows loaded later (None: leave them as read)."""
+        with self._lock:
+            self.categorizer = categorizer
+            if categorizer is not None:
+                self._swap(recategorize(self.ctx, categorizer))
+
+    def _swap(self, new_ctx: DataContext) -> None:
+        self.ctx = new_ctx
+        # entries of the old version can no longer be hit
+        FRAMES.clear()
+        PAYLOADS.clear()
+        logger.info("loaded %s: %d rows, version %s", self.path, len(new_ctx.df), new_ctx.version)
+        for fn in self.on_swap:
+            fn(new_ctx)
+
+    @timed("reload")
+    def refresh(self) -> bool:
+        """Ingest what changed under path since the last look; True when a new context was swapped in."""
+        if not self._lock.acquire(blocking=False):
+            return False        # another thread is already on it
+        try:
+            current = {p.name: p for p in list_sources(self.path)}
+            replaced = [n for n in self._files if n not in current]
+            fresh, tails = [], []
+            for name, p in current.items():
+                state, st = self._files.get(name), p.stat()
+                if state is None:
+                    fresh.append(p)
+                elif (st.st_size, st.st_mtime_ns) == (state.size, state.mtime_ns):
+                    continue
+                elif self._is_append(p, state, st.st_size):
+                    tails.append((p, state))
+                else:
+                    replaced.append(name)
+                    fresh.append(p)
+
+            if replaced:
+                # rows dropped as duplicates of a replaced file's rows may be needed again: start over
+                logger.info("reloading %s: %s changed", self.path, ", ".join(replaced))
+                self._files.clear()
+                new_ctx = self._rebuild(self._read_all(list(current.values())))
+            else:
+                frames = self._read_all(fresh)
+                frames += [df for df in (self._read_tail(p, s) for p, s in tails) if df is not None]
+                new_ctx = self._append(frames) if frames else None
+            if new_ctx is None:
+                return False
+
+            self._swap(new_ctx)
+            return True
+        finally:
+            self._lock.release()
+
+    def ensure_watcher(self) -> None:
+        """
+        Request hook: start this process's watcher thread unless it runs already (a pid check).
+        Started on the first request rather than at load, so gunicorn workers forked from a
+        --preload master each get one; threads do not survive fork.
+        """
+        if not config.RELOAD_INTERVAL_S or self._watcher_pid == os.getpid():
+            return
+        with self._watch_lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            threading.Thread(target=self._watch, name="gpay-reload", daemon=True).start()
+
+    def _watch(self) -> None:
+        """refresh() every config.RELOAD_INTERVAL_S seconds (0 stops); errors keep the current data."""
+        while config.RELOAD_INTERVAL_S:
+            time.sleep(config.RELOAD_INTERVAL_S)
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("reloading %s failed; still serving the previous data", self.path)
@@ -0,0 +1,435 @@
+# gpay_insights/extract.py
+"""
+Google Pay "My Activity" HTML (Google Takeout) -> transaction table.
+
+Port of the extractor in Notebook/Google Pay Data Extraction.ipynb that streams instead of
+loading the export: the HTML is decoded chunk by chunk and tags are turned into line breaks
+with two precompiled patterns (what html_to_text_fast did to the whole text), every text
+line is classified once as it arrives, and records are assembled from a sliding window of
+WINDOW lines. Rows are deduplicated as they are produced and written in batches, so memory
+stays flat however many years the export covers.
+
+    python -m gpay_insights.extract "My Activity.html" -o data/extracted_gpay_data.parquet
+    python -m gpay_insights.extract exports/*.html -o data/extracted_gpay_data.parquet -j 8
+
+Parquet output (needs pyarrow) is read by the dashboard like a CSV export (config.DATA_PATTERNS).
+"""
+from __future__ import annotations
+import argparse
+import codecs
+import csv
+import html as pyhtml
+import logging
+import os
+import re
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+import pandas as pd
+
+from . import config
+from .categorize import Categorizer
+from .store import HAS_ARROW
+
+if HAS_ARROW:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = [
+    "source_file", "transaction_type", "direction", "status", "amount_inr", "currency",
+    "counterparty", "category_guess", "payment_instrument", "account_last4",
+    "datetime_local", "date", "time", "time_24h", "weekday", "month", "year",
+    "product", "details_id", "raw_text",
+]
+STATUSES = frozenset({
+    "completed", "failed", "pending", "cancelled", "canceled", "processing", "refunded", "success", "succeeded",
+})
+# lines a record may span: its sentence plus the 24 lines after it
+WINDOW = 25
+
+# ---- text ----
+_RAW_BLOCK = re.compile(r"<(script|style).*?>.*?</\1>", re.I | re.S)
+_RAW_OPEN = re.compile(r"<(?:script|style)", re.I)
+_TAG = re.compile(r"<[^>]+>")
+_BLANKS = re.compile(r"[ \t]+")
+
+def _html_text(html: str) -> str:
+    text = _TAG.sub("\n", _RAW_BLOCK.sub(" ", html))
+    text = pyhtml.unescape(text).replace("\u00A0", " ").replace("\u202F", " ")
+    return _BLANKS.sub(" ", text)
+
+def _complete_prefix(buf: str) -> int:
+    """Length of buf that holds no cut tag and no unterminated script/style block."""
+    cut = buf.rfind("<")
+    if cut < 0:
+        return len(buf)
+    for m in _RAW_OPEN.finditer(buf, 0, cut):
+        block = _RAW_BLOCK.match(buf, m.start())
+        if block is None or block.end() > cut:
+            return m.start()
+    return cut
+
+def iter_text_lines(path: Path, chunk_bytes: int | None = None) -> Iterator[str]:
+    """Non-empty, whitespace-normalized text lines of an HTML file, read chunk_bytes at a time."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    buf = ""
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(chunk_bytes or config.EXTRACT_CHUNK_BYTES)
+            buf += decoder.decode(block, final=not block)
+            n = len(buf) if not block else _complete_prefix(buf)
+            for line in _html_text(buf[:n]).splitlines():
+                line = line.strip()
+                if line:
+                    yield line
+            buf = buf[n:]
+            if not block:
+                return
+
+# ---- records ----
+_START = re.compile(r"^(Paid|Sent|Received)\s+₹\s*([0-9][0-9,]*(?:\.\d{1,2})?)", re.I)
+_MONTHS = {m: i for i, m in enumerate(("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                                        "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), 1)}
+_TS = re.compile(r"\b(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+(\d{1,2}),\s+(\d{4}),\s+"
+                 r"(\d{1,2}):(\d{2}):(\d{2})\s+(AM|PM)\s+GMT([+\-])(\d{2}):(\d{2})\b")
+_PARTY = re.compile(r"\b(?:to|from|at)\s+(.+?)(?:\s+using\b|$)", re.I)
+_INSTR = re.compile(r"\busing\s+(.+)$", re.I)
+_MASKED = re.compile(r"(?:X|\*)+(?:\d{2,})", re.I)
+_LONG_DIGITS = re.compile(r"(\d{4,})\b")
+_ID = re.compile(r"^[A-Za-z0-9+/=_-]{6,}$")
+
+class _Line(NamedTuple):
+    text: str
+    start: Optional[re.Match]   # the line opens a record
+    ts: Optional[re.Match]
+    status: Optional[str]
+    details: bool               # a "Details:" heading
+    id_len: int                 # length when the line looks like a details id, else 0
+
+def _classify(text: str) -> _Line:
+    low = text.lower()
+    return _Line(
+        text,
+        _START.match(text),
+        _TS.search(text) if "GMT" in text else None,
+        text.title() if low in STATUSES else None,
+        "details" in low and ":" in text,
+        len(text) if _ID.match(text) else 0,
+    )
+
+_WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+def parse_timestamp(m: Optional[re.Match]):
+    """(iso, date, 12h time, 24h time, weekday, YYYY-MM) of a _TS match; Nones when absent/invalid."""
+    if m is None:
+        return None, None, None, None, None, None
+    mon, day, year, hh, mm, ss, ampm, sign, oh, om = m.groups()
+    try:
+        offset = timedelta(hours=int(oh), minutes=int(om)) * (1 if sign == "+" else -1)
+        h24 = int(hh) % 12 + (12 if ampm == "PM" else 0)
+        dt = datetime(int(year), _MONTHS[mon], int(day), h24, int(mm), int(ss), tzinfo=timezone(offset))
+    except ValueError:
+        return None, None, None, None, None, None
+    # formatted by hand: strftime per field was most of the cost of a record
+    ym = f"{dt.year:04d}-{dt.month:02d}"
+    return (dt.isoformat(), f"{ym}-{dt.day:02d}", f"{(h24 % 12) or 12:02d}:{mm}:{ss} {ampm}",
+            f"{h24:02d}:{mm}:{ss}", _WEEKDAYS[dt.weekday()], ym)
+
+def extract_last4(instr: Optional[str]) -> Optional[str]:
+    """Last 4 digits of a masked instrument string."""
+    if not instr:
+        return None
+    m = _MASKED.search(instr)
+    if m:
+        digits = [c for c in m.group(0) if c.isdigit()]
+        if len(digits) >= 4:
+            return "".join(digits[-4:])
+    m2 = _LONG_DIGITS.search(instr)
+    return m2.group(1)[-4:] if m2 else None
+
+def _record(win: List[_Line], source_name: str, categorizer: Optional[Categorizer]) -> tuple[dict, int]:
+    """Transaction opened by win[0] and the window offset of the next record's line (0: none)."""
+    head = win[0]
+    sentence = head.text
+    ttype = head.start.group(1).title()
+    amount = float(head.start.group(2).replace(",", ""))
+    mp, mi = _PARTY.search(sentence), _INSTR.search(sentence)
+    party = mp.group(1).strip(" .;") if mp else None
+    instr = mi.group(1).strip(" .;") if mi else None
+
+    ts = next((ln.ts for ln in win[1:] if ln.ts), None)
+    nxt = next((j for j in range(1, len(win)) if win[j].start), 0)
+    end = nxt or len(win)
+
+    details_id, status = None, None
+    for j in range(1, end):
+        ln = win[j]
+        if not status and ln.status:
+            status = ln.status
+        if ln.details:
+            for k in range(j + 1, min(end, j + 5)):
+                if win[k].id_len:
+                    details_id = win[k].text
+                    break
+        if not details_id and ln.id_len >= 10:
+            details_id = ln.text
+
+    dt_iso, date_s, time_12, time_24, weekday, month = parse_timestamp(ts)
+    if not status:
+        status = "No Status Found" if ttype == "Paid" else None
+    return {
+        "source_file": source_name,
+        "transaction_type": ttype,
+        "direction": "outgoing" if ttype in ("Paid", "Sent") else "incoming",
+        "status": status,
+        "amount_inr": amount,
+        "currency": "INR",
+        "counterparty": party,
+        "category_guess": categorizer.match(party) if categorizer else None,
+        "payment_instrument": instr,
+        "account_last4": extract_last4(instr),
+        "datetime_local": dt_iso,
+        "date": date_s,
+        "time": time_12,
+        "time_24h": time_24,
+        "weekday": weekday,
+        "month": month,
+        "year": date_s.split("-")[0] if date_s else None,
+        "product": "Google Pay",
+        "details_id": details_id,
+        "raw_text": sentence,
+    }, nxt
+
+def parse_lines(lines: Iterable[str], source_name: str,
+                categorizer: Optional[Categorizer] = None) -> Iterator[dict]:
+    """Transactions in a stream of text lines (the notebook's parse_text_lines, one window at a time)."""
+    buf: deque[_Line] = deque()
+
+    def step():
+        if buf[0].start is None:
+            buf.popleft()
+            return None
+        win = list(buf)
+        try:
+            row, nxt = _record(win, source_name, categorizer)
+        except Exception as e:
+            logger.error("Failed parsing transaction %r: %s", win[0].text, e)
+            row, nxt = None, 0
+        for _ in range(nxt or 1):
+            buf.popleft()
+        return row
+
+    for text in lines:
+        buf.append(_classify(text))
+        if len(buf) == WINDOW:
+            row = step()
+            if row is not None:
+                yield row
+    while buf:
+        row = step()
+        if row is not None:
+            yield row
+
+def dedup_key(row: dict) -> tuple:
+    """Identity of a transaction: its details id, else the fields that describe it."""
+    did = row.get("details_id")
+    if did and str(did).strip():
+        return ("id", str(did).strip())
+    return ("composite", row.get("transaction_type"), row.get("amount_inr"), row.get("currency"),
+            (row.get("counterparty") or "").strip().lower(),
+            (row.get("payment_instrument") or "").strip().lower(),
+            row.get("account_last4"), row.get("datetime_local"))
+
+def unique_rows(rows: Iterable[dict], seen: Optional[set] = None) -> Iterator[dict]:
+    """rows without repeats of an earlier dedup_key (first one wins)."""
+    seen = set() if seen is None else seen
+    for row in rows:
+        key = dedup_key(row)
+        if key not in seen:
+            seen.add(key)
+            yield row
+
+def extract_rows(input_file: Path, categorizer: Optional[Categorizer] = None) -> Iterator[dict]:
+    """Deduplicated transactions of one export, in file order."""
+    input_file = Path(input_file)
+    return unique_rows(parse_lines(iter_text_lines(input_file), input_file.name, categorizer))
+
+def extract_single_file(input_file: Path, category_csv: Optional[Path] = None) -> pd.DataFrame:
+    """All transactions of one export as a DataFrame with COLUMNS (the notebook function, minus the write)."""
+    categorizer = Categorizer.from_csv(category_csv) if category_csv else None
+    return pd.DataFrame(list(extract_rows(input_file, categorizer)), columns=COLUMNS)
+
+# ---- output ----
+def _batches(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _arrow_schema():
+    return pa.schema([(c, pa.float64() if c == "amount_inr" else pa.string()) for c in COLUMNS])
+
+def _format_of(out_path: Path, fmt: str | None) -> str:
+    return fmt or ("csv" if Path(out_path).suffix.lower() == ".csv" else "parquet")
+
+def write_rows(rows: Iterable[dict], out_path: Path, fmt: str | None = None, batch_rows: int = 50_000) -> int:
+    """
+    Stream rows to out_path as Parquet or CSV (fmt defaults to the suffix); returns the row count.
+    Written to a temporary name first, so a reader never sees a half-written export.
+    """
+    out_path = Path(out_path)
+    fmt = _format_of(out_path, fmt)
+    if fmt == "parquet" and not HAS_ARROW:
+        raise RuntimeError("Parquet output needs pyarrow (pip install 'google-pay-analysis[cache]'); use a .csv path")
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    n = 0
+    if fmt == "parquet":
+        schema = _arrow_schema()
+        with pq.ParquetWriter(tmp, schema) as writer:
+            for batch in _batches(rows, batch_rows):
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                n += len(batch)
+    else:
+        with open(tmp, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                n += 1
+    tmp.replace(out_path)
+    return n
+
+def read_rows(path: Path, fmt: str | None = None) -> Iterator[dict]:
+    """Rows of a write_rows output, streamed back (CSV values come back as strings)."""
+    if _format_of(path, fmt) == "parquet":
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=50_000):
+            yield from batch.to_pylist()
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.DictReader(f)
+
+# ---- many files ----
+@dataclass
+class FileReport:
+    path: Path
+    rows: int                    # transactions in the file (after its own dedup)
+    seconds: float
+    error: Optional[str] = None
+
+_worker_categorizer: Optional[Categorizer] = None
+
+def _init_worker(categorizer: Optional[Categorizer]) -> None:
+    global _worker_categorizer
+    _worker_categorizer = categorizer
+
+def _extract_part(path: Path, part: Path, fmt: str) -> FileReport:
+    """Extract one export to part. Top-level so it can run in a worker process."""
+    t0 = time.perf_counter()
+    try:
+        n = write_rows(extract_rows(path, _worker_categorizer), part, fmt)
+        return FileReport(path, n, time.perf_counter() - t0)
+    except Exception as e:
+        return FileReport(path, 0, time.perf_counter() - t0, f"failed: {e}")
+
+def _log_report(rep: FileReport) -> FileReport:
+    logger.info("%s: %s rows in %.2fs%s", rep.path.name, rep.rows, rep.seconds, f" ({rep.error})" if rep.error else "")
+    return rep
+
+def _run_parts(jobs: list[tuple[Path, Path]], fmt: str, categorizer, workers: int) -> dict:
+    """{input: FileReport}; uses a process pool when workers > 1."""
+    if workers <= 1 or len(jobs) <= 1:
+        _init_worker(categorizer)
+        return {path: _log_report(_extract_part(path, part, fmt)) for path, part in jobs}
+    try:
+        ex = ProcessPoolExecutor(max_workers=min(workers, len(jobs)),
+                                 initializer=_init_worker, initargs=(categorizer,))
+    except Exception:   # e.g. daemonic worker processes cannot have children
+        return _run_parts(jobs, fmt, categorizer, 1)
+    out = {}
+    with ex:
+        futs = {ex.submit(_extract_part, path, part, fmt): path for path, part in jobs}
+        for f in as_completed(futs):
+            try:
+                rep = f.result()
+            except Exception as e:   # broken pool, killed worker, ...
+                rep = FileReport(futs[f], 0, float("nan"), f"failed: {e}")
+            out[futs[f]] = _log_report(rep)
+    return out
+
+def extract_many(inputs: Iterable[Path], out_path: Path, categorizer: Optional[Categorizer] = None,
+                 workers: int | None = None, fmt: str | None = None) -> tuple[list[FileReport], int]:
+    """
+    Extract several exports (e.g. one per account) into one deduplicated out_path.
+    Files are parsed and categorized in parallel on a process pool (workers: config.EXTRACT_WORKERS;
+    None = one per CPU, 1 = serial in-process), each to a part file in a temporary directory
+    beside out_path; the parts are then merged in input order, so the first occurrence of a
+    transaction wins as in a single file. A file that fails is reported and left out.
+    Returns (one FileReport per input, rows written).
+    """
+    inputs = [Path(p) for p in inputs]
+    out_path = Path(out_path)
+    fmt = _format_of(out_path, fmt)
+    workers = config.EXTRACT_WORKERS if workers is None else workers
+    workers = workers or (os.cpu_count() or 1)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(dir=out_path.parent, prefix=".extract-") as tmp:
+        jobs = [(p, Path(tmp) / f"{i:05d}.{fmt}") for i, p in enumerate(inputs)]
+        reports = _run_parts(jobs, fmt, categorizer, workers)
+        parts = [part for p, part in jobs if reports[p].error is None]
+        n = write_rows(unique_rows(chain.from_iterable(read_rows(part, fmt) for part in parts)), out_path, fmt)
+    return [reports[p] for p in inputs], n
+
+def _html_inputs(paths: Iterable[Path]) -> list[Path]:
+    out = []
+    for p in paths:
+        out.extend(sorted(p.glob("*.html")) if p.is_dir() else [p])
+    return out
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m gpay_insights.extract",
+                                 description="Extract Google Pay transactions from Takeout 'My Activity.html' exports.")
+    ap.add_argument("inputs", type=Path, nargs="+", help="My Activity.html files, or directories of them")
+    ap.add_argument("-o", "--output", type=Path,
+                    help="output .parquet or .csv (default: extracted_gpay_data.parquet next to the first input)")
+    ap.add_argument("--categories", type=Path, default=config.CATEGORY_CSV,
+                    help="category keyword CSV, one column per category (default: %(default)s)")
+    ap.add_argument("--format", choices=("parquet", "csv"), help="override the format implied by --output")
+    ap.add_argument("-j", "--workers", type=int, help="parallel processes for several inputs (default: one per CPU)")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    inputs = _html_inputs(args.inputs)
+    if not inputs:
+        ap.error("no .html inputs found")
+    out = args.output or inputs[0].parent / ("extracted_gpay_data." + ("parquet" if HAS_ARROW else "csv"))
+    categorizer = Categorizer.from_csv(args.categories) if args.categories and args.categories.exists() else None
+
+    t0 = time.perf_counter()
+    if len(inputs) == 1:
+        n = write_rows(extract_rows(inputs[0], categorizer), out, args.format)
+    else:
+        reports, n = extract_many(inputs, out, categorizer, args.workers, args.format)
+        for rep in reports:
+            print(f"{rep.path}\t{rep.rows} rows\t{rep.seconds:.2f}s" + (f"\t{rep.error}" if rep.error else ""))
+        dropped = sum(r.rows for r in reports) - n
+        logger.info("Merged %d files: %d duplicate rows across files dropped", len(reports), dropped)
+    logger.info("Saved %d transactions to %s in %.2fs", n, out, time.perf_counter() - t0)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,11 +1,13 @@
 import plotly.express as px
 from .. import config
+from ..metrics import timed
 from ..utils.formatting import indian_number
 
+@timed("top_categories_figure")
 def top_categories_figure(dff, cat_col, amt_col):
     if not cat_col: return px.bar(title="Top Spend Categories")
     cat = (dff.loc[dff["_flow"]=="Outflow"]
-             .groupby(cat_col)[amt_col].sum().reset_index())
+             .groupby(cat_col, observed=True)[amt_col].sum().reset_index())
     cat = cat[~cat[cat_col].astype(str).str.lower().isin(config.EXCLUDE_CATS)]
     cat = cat.sort_values(amt_col, ascending=False).head(20)
     fig = px.bar(cat, x=cat_col, y=amt_col, title="Top Spend Categories",
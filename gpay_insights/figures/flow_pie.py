@@ -1,19 +1,10 @@
 import pandas as pd
 import plotly.express as px
 from .. import config
+from ..metrics import timed
+from ..utils.classify import payment_class
 
-_PAID_KEYS = ("paid", "payment", "purchase", "bill", "charge", "debit")
-_SENT_KEYS = ("sent",)          # keep "sent" distinct if present
-_RECV_KEYS = ("received", "credit", "refund", "cashback")
-
-def _class_from_tx_str(s: str) -> str | None:
-    if not s: return None
-    s = str(s).lower()
-    if any(k in s for k in _RECV_KEYS): return "Received"
-    if any(k in s for k in _SENT_KEYS): return "Sent"
-    if any(k in s for k in _PAID_KEYS): return "Paid"
-    return None
-
+@timed("flow_pie_figure")
 def flow_pie_figure(dff: pd.DataFrame, tx_col: str | None, amt_col: str, metric: str = "amount"):
     """
     Pie of Paid / Sent / Received. Works best when a transaction type column exists.
@@ -23,21 +14,24 @@ def flow_pie_figure(dff: pd.DataFrame, tx_col: str | None, amt_col: str, metric:
     if dff.empty:
         return px.pie(title="Paid / Sent / Received")
 
-    df = dff.copy()
-    if tx_col and tx_col in df.columns:
-        lab = df[tx_col].map(_class_from_tx_str)
+    if "_psr" in dff.columns:
+        # classified once per distinct type string at load (data_loader.normalize_frame)
+        df = dff
     else:
-        # Fallback: infer from direction
-        lab = df["_flow"].map(lambda v: "Received" if v == "Inflow" else ("Paid/Sent" if v == "Outflow" else None))
-
-    df["_psr"] = lab
+        df = dff.copy()
+        if tx_col and tx_col in df.columns:
+            lab = df[tx_col].map(payment_class)
+        else:
+            # Fallback: infer from direction
+            lab = df["_flow"].map(lambda v: "Received" if v == "Inflow" else ("Paid/Sent" if v == "Outflow" else None))
+        df["_psr"] = lab
     df = df[df["_psr"].isin(["Paid","Sent","Received","Paid/Sent"])]
 
     if metric == "count":
-        agg = df.groupby("_psr").size().reset_index(name="value")
+        agg = df.groupby("_psr", observed=True).size().reset_index(name="value")
         # title = "Count for - "
     else:
-        agg = df.groupby("_psr")[amt_col].sum().reset_index(name="value")
+        agg = df.groupby("_psr", observed=True)[amt_col].sum().reset_index(name="value")
         # title = "Amount for - "
 
     fig = px.pie(agg, names="_psr",
@@ -1,3 +1,9 @@
+import os
+import threading
+import time
+import multiprocessing as mp
+from multiprocessing.connection import wait as mp_wait
+from dataclasses import dataclass
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
@@ -9,34 +15,190 @@ except Exception:
     HAS_SM = False
 
 from .. import config
-from ..utils.formatting import fmt_currency_indian
+from ..metrics import timed
+from ..utils.formatting import fmt_currency_indian_array
+from ..utils.memo import SingleFlight
+
+# candidate grid searched by fit_sarimax_grid
+SARIMAX_ORDERS = [(1,1,1), (2,1,1), (1,1,2)]
+SARIMAX_SEASONALS = [(1,0,1,12), (0,1,1,12), (1,1,1,12)]
+
+@dataclass
+class GridResult:
+    best: object | None          # fitted SARIMAXResults (None if every fit failed)
+    spec: tuple | None           # (order, seasonal_order) of best
+    table: pd.DataFrame          # one row per candidate: order, seasonal_order, aic, status, seconds
+
+def _fit_candidate(y_log: pd.Series, order, seasonal, maxiter=None):
+    """Fit one SARIMAX spec. Top-level so it can run in a worker process."""
+    t0 = time.perf_counter()
+    try:
+        mod = sm.tsa.statespace.SARIMAX(
+            y_log, order=order, seasonal_order=seasonal, trend="c",
+            enforce_stationarity=False, enforce_invertibility=False
+        )
+        res = mod.fit(disp=False, **({"maxiter": maxiter} if maxiter else {}))
+        return res.aic, res, "ok", time.perf_counter() - t0
+    except Exception as e:
+        return float("inf"), None, f"failed: {e}", time.perf_counter() - t0
+
+def _fit_in_child(conn, y_log, order, seasonal, maxiter):
+    """Process target: send _fit_candidate's result back through conn."""
+    try:
+        conn.send(_fit_candidate(y_log, order, seasonal, maxiter))
+    except Exception as e:      # unpicklable result
+        conn.send((float("inf"), None, f"failed: {e}", float("nan")))
+    finally:
+        conn.close()
+
+def _mp_context():
+    # fork where there is one: children start at once and do not re-import __main__
+    # (app.py builds the whole app at import time)
+    return mp.get_context("fork" if "fork" in mp.get_all_start_methods() else None)
+
+def _run_fits(y_log, specs, workers, timeout, maxiter=None) -> dict:
+    """
+    {spec: (aic, res, status, seconds)}; one child process per fit, at most `workers` at a
+    time, when workers > 1. A fit still running `timeout` seconds after its own start is
+    terminated. When a child cannot be started (e.g. inside a daemonic background-job
+    process) the remaining fits run serially in-process, and serial fits have no timeout.
+    """
+    if workers <= 1 or len(specs) <= 1:
+        return {spec: _fit_candidate(y_log, *spec, maxiter) for spec in specs}
+    ctx = _mp_context()
+    queue, out = list(specs), {}
+    running: dict = {}          # result pipe -> (spec, process, start time)
+    try:
+        while queue or running:
+            while queue and len(running) < workers:
+                spec = queue[0]
+                recv, send = ctx.Pipe(duplex=False)
+                proc = ctx.Process(target=_fit_in_child, args=(send, y_log, *spec, maxiter), daemon=True)
+                try:
+                    proc.start()
+                except Exception:   # daemonic processes cannot have children, ...
+                    recv.close()
+                    send.close()
+                    out.update(_run_fits(y_log, queue, 1, timeout, maxiter))
+                    queue = []
+                    break
+                send.close()
+                running[recv] = (spec, proc, time.monotonic())
+                queue.pop(0)
+            if not running:
+                break
+            left = None
+            if timeout is not None:
+                left = max(0.0, min(t0 for _, _, t0 in running.values()) + timeout - time.monotonic())
+            for conn in mp_wait(list(running), timeout=left):
+                spec, proc, t0 = running.pop(conn)
+                try:
+                    out[spec] = conn.recv()
+                except EOFError:    # the child died without a result
+                    out[spec] = (float("inf"), None, f"failed: worker exit code {proc.exitcode}",
+                                 time.monotonic() - t0)
+                conn.close()
+                proc.join()
+            now = time.monotonic()
+            for conn, (spec, proc, t0) in list(running.items()):
+                if timeout is not None and now - t0 >= timeout:
+                    proc.terminate()
+                    proc.join()
+                    conn.close()
+                    del running[conn]
+                    out[spec] = (float("inf"), None, "timeout", now - t0)
+    finally:
+        for conn, (_, proc, _) in running.items():      # only left on an error
+            proc.terminate()
+            proc.join()
+            conn.close()
+    return out
+
+def sarimax_grid_search(y_log: pd.Series, orders=None, seasonals=None, workers=None,
+                        timeout=None, prune_delta=None) -> GridResult:
+    """
+    AIC grid search over orders x seasonals, fits run in parallel in child processes.
+    - workers: fits at a time (config.SARIMAX_WORKERS; None = one per CPU, 1 = serial in-process)
+    - timeout: seconds allowed per fit from its start (config.SARIMAX_FIT_TIMEOUT); slower fits
+      are terminated and dropped (parallel runs only; serial fits are not time-limited)
+    - prune_delta: if set, first run a cheap pass (config.SARIMAX_PRUNE_MAXITER iterations) and
+      only fully fit candidates whose rough AIC is within prune_delta of the best one
+    """
+    if not HAS_SM:
+        return GridResult(None, None, pd.DataFrame(columns=["order","seasonal_order","aic","status","seconds"]))
+    specs = [(o, s) for o in (orders or SARIMAX_ORDERS) for s in (seasonals or SARIMAX_SEASONALS)]
+    workers = config.SARIMAX_WORKERS if workers is None else workers
+    workers = workers or (os.cpu_count() or 1)
+    timeout = config.SARIMAX_FIT_TIMEOUT if timeout is None else timeout
+    prune_delta = config.SARIMAX_PRUNE_DELTA if prune_delta is None else prune_delta
+
+    results, survivors = {}, specs
+    if prune_delta is not None and len(specs) > 1:
+        rough = _run_fits(y_log, specs, workers, timeout, maxiter=config.SARIMAX_PRUNE_MAXITER)
+        best_rough = min(r[0] for r in rough.values())
+        survivors = [sp for sp in specs if rough[sp][0] <= best_rough + prune_delta]
+        for sp in specs:
+            if sp not in survivors:
+                aic, _, status, secs = rough[sp]
+                results[sp] = (aic, None, "pruned" if status == "ok" else status, secs)
+    results.update(_run_fits(y_log, survivors, workers, timeout))
+
+    table = pd.DataFrame([
+        {"order": sp[0], "seasonal_order": sp[1], "aic": r[0], "status": r[2], "seconds": r[3]}
+        for sp, r in results.items()
+    ]).sort_values("aic", kind="stable").reset_index(drop=True)
+
+    fitted = [(r[0], sp, r[1]) for sp, r in results.items() if r[1] is not None and np.isfinite(r[0])]
+    if fitted:
+        _, spec, best = min(fitted, key=lambda t: t[0])
+        return GridResult(best, spec, table)
+    try:
+        mod = sm.tsa.statespace.SARIMAX(y_log, order=(1,1,1), trend="c",
+                                        enforce_stationarity=False, enforce_invertibility=False)
+        return GridResult(mod.fit(disp=False), ((1,1,1), (0,0,0,0)), table)
+    except Exception:
+        return GridResult(None, None, table)
 
 def fit_sarimax_grid(y_log: pd.Series):
-    if not HAS_SM: return None
-    best_aic, best_res, best_spec = float("inf"), None, None
-    orders = [(1,1,1), (2,1,1), (1,1,2)]
-    seasonals = [(1,0,1,12), (0,1,1,12), (1,1,1,12)]
-    for order in orders:
-        for seasonal in seasonals:
-            try:
-                mod = sm.tsa.statespace.SARIMAX(
-                    y_log, order=order, seasonal_order=seasonal, trend="c",
-                    enforce_stationarity=False, enforce_invertibility=False
-                )
-                res = mod.fit(disp=False)
-                if res.aic < best_aic:
-                    best_aic, best_res, best_spec = res.aic, res, (order, seasonal)
-            except Exception:
-                pass
-    if best_res is None:
-        try:
-            mod = sm.tsa.statespace.SARIMAX(y_log, order=(1,1,1), trend="c",
-                                            enforce_stationarity=False, enforce_invertibility=False)
-            best_res = mod.fit(disp=False)
-        except Exception:
-            return None
-    return best_res
+    return sarimax_grid_search(y_log).best
+
+# (data version, status_col) -> (fig, fdf); the forecast only depends on the full history
+_FORECAST_CACHE: dict = {}
+_FORECAST_LOCK = threading.Lock()
+
+def _after_fork_in_child() -> None:
+    global _FORECAST_LOCK         # see utils/memo.py: forked jobs must not inherit a held lock
+    _FORECAST_LOCK = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+_FORECAST_KEEP = 4
+_FORECAST_FLIGHTS = SingleFlight()
 
+def cached_forecast(datactx):
+    """
+    forecast_figure on the full (unfiltered) history of datactx, fitted once per data version.
+    Shared by the dashboard figure and the CSV download.
+    """
+    key = (datactx.version, datactx.status_col)
+    with _FORECAST_LOCK:
+        hit = _FORECAST_CACHE.get(key)
+    if hit is not None:
+        return hit
+
+    def fit():
+        with _FORECAST_LOCK:
+            if key in _FORECAST_CACHE:
+                return _FORECAST_CACHE[key]
+        out = forecast_figure(datactx.df, datactx.date_col, datactx.amt_col, status_col=datactx.status_col)
+        with _FORECAST_LOCK:
+            while len(_FORECAST_CACHE) >= _FORECAST_KEEP:
+                _FORECAST_CACHE.pop(next(iter(_FORECAST_CACHE)))
+            _FORECAST_CACHE[key] = out
+        return out
+    return _FORECAST_FLIGHTS.do(key, fit)      # one fit per version, however many requests ask at once
+
+@timed("forecast_figure")
 def forecast_figure(df, date_col, amt_col, status_col=None):
     """12-month forecast of Completed + Outflow monthly sums using log1p SARIMAX."""
     if not HAS_SM:
@@ -44,15 +206,14 @@ def forecast_figure(df, date_col, amt_col, status_col=None):
         fig.add_annotation(text="pip install statsmodels", x=0.5, y=0.5, xref="paper", yref="paper", showarrow=False)
         return fig, pd.DataFrame()
 
-    d = df.copy()
-
-    # Completed-only (if status is present)
-    if status_col and status_col in d.columns:
-        ss = d[status_col].astype(str).str.lower().str.strip()
-        d = d[ss.isin(config.COMPLETED_TOKENS)]
-
-    # Outflow only
-    d = d[d["_flow"] == "Outflow"]
+    # Completed (precomputed by the loader; derived from status_col otherwise) Outflow rows,
+    # date and amount only: no full copy of the frame
+    keep = (df["_flow"] == "Outflow").to_numpy()
+    if "_completed" in df.columns:
+        keep &= df["_completed"].to_numpy()
+    elif status_col and status_col in df.columns:
+        keep &= df[status_col].astype(str).str.lower().str.strip().isin(config.COMPLETED_TOKENS).to_numpy()
+    d = df.loc[keep, [date_col, amt_col]]
     if d.empty:
         return go.Figure().update_layout(title="12-Month Transaction Forecast"), pd.DataFrame()
 
@@ -61,7 +222,8 @@ def forecast_figure(df, date_col, amt_col, status_col=None):
     monthly["y"] = monthly["y"].fillna(0.0)
 
     y_log = np.log1p(monthly["y"])
-    res = fit_sarimax_grid(y_log)
+    grid = sarimax_grid_search(y_log)
+    res = grid.best
     if res is None:
         return go.Figure().update_layout(title="12-Month Transaction Forecast (model failed)"), pd.DataFrame()
 
@@ -78,18 +240,21 @@ def forecast_figure(df, date_col, amt_col, status_col=None):
         "yhat_lower": np.maximum(0.0, np.expm1(ci_log[lower_col].values)),
         "yhat_upper": np.maximum(0.0, np.expm1(ci_log[upper_col].values)),
     })
+    # chosen spec + per-candidate AIC table, for inspection (not written to the CSV)
+    fdf.attrs["sarimax_spec"] = grid.spec
+    fdf.attrs["sarimax_grid"] = grid.table
 
     ymin = float(min(monthly["y"].min(), fdf["yhat_lower"].min()))
     ymax = float(max(monthly["y"].max(), fdf["yhat_upper"].max()))
     ymin = min(0.0, ymin)
     ticks = np.linspace(ymin, ymax, 7)
     tickvals = [float(t) for t in ticks]
-    ticktext = [fmt_currency_indian(t) for t in ticks]
+    ticktext = fmt_currency_indian_array(ticks).tolist()
 
-    hist_hover = [f"Month={idx.strftime('%b %Y')}<br>Amount={fmt_currency_indian(val)}"
-                  for idx, val in zip(monthly.index, monthly["y"])]
-    fcst_hover = [f"Month={idx.strftime('%b %Y')}<br>Forecast={fmt_currency_indian(val)}"
-                  for idx, val in zip(fdf['ds'], fdf['yhat'])]
+    hist_hover = ("Month=" + monthly.index.strftime("%b %Y") + "<br>Amount="
+                  + fmt_currency_indian_array(monthly["y"])).tolist()
+    fcst_hover = ("Month=" + fdf["ds"].dt.strftime("%b %Y") + "<br>Forecast="
+                  + fmt_currency_indian_array(fdf["yhat"])).tolist()
 
     COLOR_ACTUAL = "#2A9D8F"
     COLOR_FORECAST = "#7B61FF"
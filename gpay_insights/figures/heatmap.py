@@ -1,17 +1,24 @@
 import plotly.graph_objects as go
 import pandas as pd
 from .. import config
+from ..metrics import timed
+from ..cube import COUNT_COL
 
+@timed("heatmap_figure")
 def heatmap_figure(dff, amt_col, metric="count"):
     base = dff.loc[dff["_flow"]=="Outflow"].copy()
     if base.empty:
         return go.Figure().update_layout(title="When do you spend more?")
     if metric == "amount":
         hm = base.groupby(["_dow","_hour"])[amt_col].sum().reset_index(name="value")
+    elif COUNT_COL in base.columns:  # aggregate cube cells carry their row count
+        hm = base.groupby(["_dow","_hour"])[COUNT_COL].sum().reset_index(name="value")
     else:
         hm = base.groupby(["_dow","_hour"]).size().reset_index(name="value")
 
     dow_order = ["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday","Sunday"]
+    if pd.api.types.is_integer_dtype(hm["_dow"]):   # stored as int8, 0 = Monday
+        hm["_dow"] = hm["_dow"].map(dict(enumerate(dow_order)))
     hm["_dow"] = pd.Categorical(hm["_dow"], categories=dow_order, ordered=True)
     hm = hm.sort_values(["_dow","_hour"])
     pivot = hm.pivot(index="_dow", columns="_hour", values="value").fillna(0)
@@ -1,9 +1,11 @@
 import plotly.express as px
 from .. import config
+from ..metrics import timed
 
+@timed("instruments_donut_figure")
 def instruments_donut_figure(dff, instr_col, amt_col):
     if not instr_col: return px.pie(title="Payment Method Split (Outflow, Completed)")
-    ins = (dff.loc[dff["_flow"]=="Outflow"].groupby(instr_col)[amt_col]
+    ins = (dff.loc[dff["_flow"]=="Outflow"].groupby(instr_col, observed=True)[amt_col]
              .sum().sort_values(ascending=False).reset_index())
     fig = px.pie(ins, names=instr_col, values=amt_col, hole=0.55,
                  title="Payment Method Split (Outflow, Completed)")
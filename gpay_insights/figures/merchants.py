@@ -1,8 +1,10 @@
 import numpy as np
 import plotly.graph_objects as go
 from .. import config
-from ..utils.formatting import indian_number
+from ..metrics import timed
+from ..utils.formatting import indian_number_array
 
+@timed("merchant_pareto_figure")
 def merchant_pareto_figure(dff, merchant_col, amt_col, topn=25):
     """
     Pareto of merchants (Completed Outflow), with:
@@ -16,7 +18,7 @@ def merchant_pareto_figure(dff, merchant_col, amt_col, topn=25):
 
     m = (
         dff.loc[dff["_flow"] == "Outflow"]
-           .groupby(merchant_col)[amt_col].sum()
+           .groupby(merchant_col, observed=True)[amt_col].sum()
            .sort_values(ascending=False).head(int(topn)).reset_index()
     )
     if m.empty:
@@ -51,7 +53,7 @@ def merchant_pareto_figure(dff, merchant_col, amt_col, topn=25):
     ymax = float(m[amt_col].max()) * 1.08
     ticks = np.linspace(0, ymax, 6)
     tickvals = [float(t) for t in ticks]
-    ticktext = [indian_number(t) for t in ticks]
+    ticktext = indian_number_array(ticks).tolist()
 
     fig.update_layout(
         title=f"Merchant Pareto (Top {int(topn)}, Completed Outflow)",
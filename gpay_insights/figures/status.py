@@ -1,8 +1,10 @@
 import plotly.express as px
 from .. import config
+from ..metrics import timed
 
+@timed("status_bar_figure")
 def status_bar_figure(dff, status_col, amt_col):
-    st = dff.groupby(status_col)[amt_col].sum().sort_values(ascending=False).reset_index()
+    st = dff.groupby(status_col, observed=True)[amt_col].sum().sort_values(ascending=False).reset_index()
     fig = px.bar(st, x=status_col, y=amt_col, title="Status (Amount)",
                  labels={status_col:"Status", amt_col:"Amount (₹)"})
     fig.update_traces(hovertemplate="%{x}<br>₹%{y:.0f}<extra></extra>")
@@ -3,7 +3,8 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from .. import config
-from ..utils.formatting import indian_number
+from ..metrics import timed
+from ..utils.formatting import indian_number_array
 from ..utils.filters import apply_completed_only
 
 def _set_stable_y(fig: go.Figure, max_y: float, *, bottom=42, left=64):
@@ -16,7 +17,7 @@ def _set_stable_y(fig: go.Figure, max_y: float, *, bottom=42, left=64):
             range=[0, ymax],
             tickmode="array",
             tickvals=[float(t) for t in ticks],
-            ticktext=[indian_number(t) for t in ticks],
+            ticktext=indian_number_array(ticks).tolist(),
             title="Amount (₹)",
         ),
         xaxis=dict(title="Month")
@@ -37,11 +38,12 @@ def add_year_bands(fig: go.Figure, months: pd.Series):
         fig.add_annotation(x=x0, y=1.02, xref="x", yref="paper",
                            text=str(y), showarrow=False, font=dict(size=10, color="#666"))
 
+@timed("monthly_spend_figure")
 def monthly_spend_figure(dff: pd.DataFrame, date_col: str, amt_col: str) -> go.Figure:
     ts = (dff.loc[dff["_flow"]=="Outflow"].groupby("_month")[amt_col].sum().reset_index())
     if ts.empty:
         return go.Figure().update_layout(title="Monthly Spend (Outflow, Completed)")
-    ts["y_fmt"] = ts[amt_col].map(indian_number)
+    ts["y_fmt"] = indian_number_array(ts[amt_col])
     ts["month_label"] = ts["_month"].dt.strftime("%b %Y")
     fig = px.bar(ts, x="_month", y=amt_col, title="Monthly Spend (Outflow, Completed)")
     fig.update_traces(
@@ -55,6 +57,7 @@ def monthly_spend_figure(dff: pd.DataFrame, date_col: str, amt_col: str) -> go.F
     add_year_bands(fig, ts["_month"])
     return fig
 
+@timed("cumulative_spend_figure")
 def cumulative_spend_figure(dff: pd.DataFrame, amt_col: str) -> go.Figure:
     ts2 = (dff.loc[dff["_flow"]=="Outflow"]
              .groupby("_month")[amt_col].sum()
@@ -1,13 +1,15 @@
 import plotly.express as px
 from .. import config
+from ..metrics import timed
 
+@timed("treemap_figure")
 def treemap_figure(dff, cat_col, merchant_col, amt_col):
 
     if not (cat_col and merchant_col): return px.treemap(title="Category → Merchant")
 
     tdf = dff.loc[dff["_flow"]=="Outflow", [cat_col, merchant_col, amt_col]].copy()
     tdf = tdf[~tdf[cat_col].astype(str).str.lower().isin(config.EXCLUDE_CATS)]
-    tdf = tdf.groupby([cat_col, merchant_col])[amt_col].sum().reset_index()
+    tdf = tdf.groupby([cat_col, merchant_col], observed=True)[amt_col].sum().reset_index()
 
     fig = px.treemap(tdf,
                      path=[cat_col, merchant_col],
@@ -4,8 +4,10 @@ import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from .. import config
+from ..metrics import timed
 
 
+@timed("monthly_txn_count_figure")
 def monthly_txn_count_figure(df: pd.DataFrame, date_col: str) -> go.Figure:
     """
     Completed-only dataframe expected (we pass dff_c from callbacks).
@@ -3,6 +3,10 @@ from dash import dcc, html, dash_table
 from .. import config
 
 
+def _status(panel):
+    # filled while the panel's background job runs (see background.py)
+    return html.Div(id=f"{panel}-status", style={"fontSize": "12px", "color": "#888", "minHeight": "16px"})
+
 def build_layout(ctx):
     # A convenient, slightly taller height for charts that need room
     FIG_H_STD = getattr(config, "FIG_H", 360)
@@ -11,6 +15,7 @@ def build_layout(ctx):
     return html.Div([
         # ---------------- Stores ----------------
         dcc.Store(id="filters-store", data={"start": str(ctx.min_date), "end": str(ctx.max_date)}),
+        dcc.Store(id="rfm-store"),      # filter state whose RFM frame is ready (see callbacks/main.py)
 
         # ---------------- Date controls ----------------
         html.Div([
@@ -209,6 +214,7 @@ def build_layout(ctx):
             html.Div([
                 html.Div([
                     html.Div("Category → Merchant", style={"fontWeight": 600, "marginBottom": "4px"}),
+                    _status("treemap"),
                     html.Div(id="treemap-total",
                              style={"fontSize": "12px", "color": "#555", "marginBottom": "6px"}),
                     dcc.Graph(
@@ -239,6 +245,7 @@ def build_layout(ctx):
             html.Div([
                 html.Div("12-Month Forecast (Completed Outflow)",
                          style={"fontWeight": 600, "marginBottom": "6px"}),
+                _status("forecast"),
                 html.Button(
                     "Download forecast CSV",
                     id="btn-dl-forecast",
@@ -266,11 +273,17 @@ def build_layout(ctx):
             html.Div([
                 html.Div("RFM Scores by Merchant (current filter)",
                          style={"fontWeight": 600, "marginBottom": "6px"}),
+                _status("rfm"),
                 dash_table.DataTable(
                     id="tbl_rfm",
+                    # paged / sorted / filtered server-side; only the visible page is sent
+                    page_current=0,
                     page_size=12,
-                    sort_action="native",
-                    filter_action="native",
+                    page_action="custom",
+                    sort_action="custom",
+                    sort_by=[],
+                    filter_action="custom",
+                    filter_query="",
                     style_table={"overflowX": "auto", "maxHeight": "420px", "overflowY": "auto"},
                     style_cell={
                         "fontFamily": "Inter, system-ui, -apple-system, Segoe UI, Roboto",
@@ -297,9 +310,14 @@ def build_layout(ctx):
                 ),
                 dash_table.DataTable(
                     id="tbl_merchant_tx",
+                    # paged / sorted / filtered server-side; only the visible page is sent
+                    page_current=0,
                     page_size=12,
-                    sort_action="native",
-                    filter_action="native",
+                    page_action="custom",
+                    sort_action="custom",
+                    sort_by=[],
+                    filter_action="custom",
+                    filter_query="",
                     style_table={"maxHeight": "440px", "overflowY": "auto"},
                     style_cell={
                         "fontFamily": "Inter, system-ui, -apple-system, Segoe UI, Roboto",
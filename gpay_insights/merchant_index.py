@@ -0,0 +1,128 @@
+# gpay_insights/merchant_index.py
+"""
+Row positions of each merchant, grouped once at load time.
+
+The rows of a date-sorted frame are reordered by merchant code (stably, so each merchant's
+rows stay in date order): merchant k owns order[offsets[k]:offsets[k+1]]. Alongside, every
+row gets the key (code << 32) + day, which is then globally sorted, so the rows of any set of
+merchants over a range of days are found with two vectorized binary searches, and a running
+sum of Completed Outflow amounts in the same order gives their spend in that range.
+
+The vocabulary of lower-cased names, one entry per word start, is sorted too: merchants
+matching a typed prefix are a contiguous run of it.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+_DAY_BIAS = 1 << 31         # keeps pre-1970 days positive inside a key
+
+def _codes(s: pd.Series) -> tuple[np.ndarray, pd.Index]:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.cat.codes.to_numpy(), s.cat.categories
+    codes, uniques = pd.factorize(s)
+    return codes, pd.Index(uniques)
+
+def _day(d) -> int:
+    return int(np.datetime64(pd.Timestamp(d).normalize(), "D").astype(np.int64)) + _DAY_BIAS
+
+def _vocabulary(names: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(sorted lower-cased name suffixes starting at a word, code of each)."""
+    terms, codes = [], []
+    for code, name in enumerate(names):
+        low = name.strip().lower()
+        for i, ch in enumerate(low):
+            if i == 0 or (low[i - 1] == " " and ch != " "):
+                terms.append(low[i:])
+                codes.append(code)
+    terms = np.array(terms, dtype=object)
+    codes = np.array(codes, dtype=np.int64)
+    by = np.argsort(terms, kind="stable")
+    return terms[by], codes[by]
+
+@dataclass
+class MerchantIndex:
+    names: np.ndarray       # merchant (str) per code
+    codes_of: dict          # merchant -> code
+    offsets: np.ndarray     # int64, len(names) + 1
+    order: np.ndarray       # int64 row positions, grouped by code, date order within a group
+    keys: np.ndarray        # int64 (code << 32) + day of order's rows, ascending
+    spend: np.ndarray       # float64 running sum of Completed Outflow amounts, len(order) + 1
+    terms: np.ndarray       # see _vocabulary
+    term_codes: np.ndarray
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, merchant_col: str, date_col: str, amt_col: str) -> "MerchantIndex":
+        codes, names = _codes(df[merchant_col])
+        valid = np.flatnonzero(codes >= 0)
+        order = valid[np.argsort(codes[valid], kind="stable")].astype(np.int64)
+        counts = np.bincount(codes[valid], minlength=len(names))
+        return cls._from(df, names, counts, order, date_col, amt_col)
+
+    @classmethod
+    def _from(cls, df: pd.DataFrame, names: pd.Index, counts: np.ndarray, order: np.ndarray,
+              date_col: str, amt_col: str) -> "MerchantIndex":
+        offsets = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        days = df[date_col].to_numpy()[order].astype("datetime64[D]").astype(np.int64) + _DAY_BIAS
+        keys = (np.repeat(np.arange(len(names), dtype=np.int64), counts) << 32) + days
+        out = df["_completed"].to_numpy()[order] & (df["_flow"] == "Outflow").to_numpy()[order]
+        spend = np.zeros(len(order) + 1)
+        np.cumsum(np.where(out, df[amt_col].to_numpy(dtype=float)[order], 0.0), out=spend[1:])
+        names = np.array([str(n) for n in names], dtype=object)
+        return cls(names, {n: i for i, n in enumerate(names)}, offsets, order, keys, spend, *_vocabulary(names))
+
+    def extend(self, df: pd.DataFrame, merchant_col: str, date_col: str, amt_col: str, start: int) -> "MerchantIndex":
+        """
+        Index of df, whose rows before `start` are the ones indexed here (same positions) and
+        whose rows from `start` on are all dated after them. New merchants may have been
+        inserted among the categories as long as the known ones keep their relative order.
+        """
+        if not isinstance(df[merchant_col].dtype, pd.CategoricalDtype):
+            return MerchantIndex.build(df, merchant_col, date_col, amt_col)
+        codes, names = _codes(df[merchant_col].iloc[start:])
+        remap = pd.Index([str(n) for n in names]).get_indexer(self.names)     # old code -> new code
+        if (remap < 0).any() or (np.diff(remap) <= 0).any():
+            return MerchantIndex.build(df, merchant_col, date_col, amt_col)
+        valid = np.flatnonzero(codes >= 0)
+        tail = valid[np.argsort(codes[valid], kind="stable")]
+        tail_codes = codes[tail]
+        # each row goes right after the old rows of every merchant sorting up to its own
+        at = self.offsets[np.searchsorted(remap, tail_codes, side="right")]
+        counts = np.bincount(tail_codes, minlength=len(names))
+        counts[remap] += np.diff(self.offsets)
+        return MerchantIndex._from(df, names, counts, np.insert(self.order, at, tail + start), date_col, amt_col)
+
+    def _bounds(self, codes, start, end) -> tuple[np.ndarray, np.ndarray]:
+        codes = np.asarray(codes, dtype=np.int64) << 32
+        return (np.searchsorted(self.keys, codes + _day(start), side="left"),
+                np.searchsorted(self.keys, codes + _day(end) + 1, side="left"))
+
+    def rows(self, merchant, start, end) -> np.ndarray:
+        """Positions of merchant's rows in start..end (inclusive days), ascending; empty when unknown."""
+        k = self.codes_of.get(str(merchant))
+        if k is None:
+            return np.empty(0, dtype=np.int64)
+        i, j = self._bounds([k], start, end)
+        return self.order[i[0]:j[0]]
+
+    def search(self, query: str, start, end, limit: int) -> list[str]:
+        """
+        Up to limit merchants with rows in start..end and a word starting with query (all of
+        them for an empty query), by Completed Outflow spend in the range, then row count.
+        """
+        q = (query or "").strip().lower()
+        if q:
+            lo = np.searchsorted(self.terms, q, side="left")
+            hi = np.searchsorted(self.terms, q + "\U0010ffff", side="left")
+            codes = np.unique(self.term_codes[lo:hi])
+        else:
+            codes = np.arange(len(self.names))
+        i, j = self._bounds(codes, start, end)
+        active = j > i
+        codes, i, j = codes[active], i[active], j[active]
+        spend, count = self.spend[j] - self.spend[i], j - i
+        top = np.lexsort((self.names[codes], -count, -spend))[:limit]
+        return self.names[codes[top]].tolist()
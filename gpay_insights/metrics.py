@@ -0,0 +1,203 @@
+# gpay_insights/metrics.py
+"""
+Latency instrumentation for the Dash callbacks.
+
+timed(stage) is a context manager / decorator: each use adds its duration to the stage's
+histogram and, inside a request, to that request's Server-Timing header. install() adds the
+per-callback histogram, the header on /_dash-update-component responses, a Prometheus text
+endpoint (config.METRICS_PATH) and the sampled profiler (config.PROFILE).
+
+Histograms live in the worker process: under gunicorn each scrape of /metrics sees the
+worker that answered it.
+"""
+from __future__ import annotations
+import bisect
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import ContextDecorator
+from datetime import datetime
+from pathlib import Path
+
+from flask import Response, g, has_request_context, request
+
+from . import config
+
+try:
+    from pyinstrument import Profiler as _Pyinstrument
+    HAS_PYINSTRUMENT = True
+except Exception:
+    HAS_PYINSTRUMENT = False
+
+logger = logging.getLogger(__name__)
+
+class Histogram:
+    """Cumulative-bucket latency histogram per label value, Prometheus style."""
+
+    def __init__(self, name: str, label: str, help_text: str, buckets=None):
+        self.name, self.label, self.help = name, label, help_text
+        self.buckets = tuple(buckets or config.METRICS_BUCKETS_S)
+        self._series: dict[str, list] = {}      # label value -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: str, seconds: float) -> None:
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            s = self._series.get(value)
+            if s is None:
+                s = self._series[value] = [0] * (len(self.buckets) + 1) + [0.0]
+            s[i] += 1
+            s[-1] += seconds
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for value, s in sorted(series.items()):
+            lbl = f'{self.label}="{_escape(value)}"'
+            total = 0
+            for le, n in zip([*map(repr, self.buckets), "+Inf"], s[:-1]):
+                total += n
+                lines.append(f'{self.name}_bucket{{{lbl},le="{le}"}} {total}')
+            lines.append(f"{self.name}_sum{{{lbl}}} {s[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{lbl}}} {total}")
+        return lines
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+CALLBACKS = Histogram("gpay_callback_seconds", "callback", "Dash callback request latency.")
+STAGES = Histogram("gpay_stage_seconds", "stage", "Time spent in one stage of a callback (filtering, figure builders, RFM, ...).")
+
+class timed(ContextDecorator):
+    """Time a block or function as `stage` (STAGES histogram + this request's Server-Timing)."""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def _recreate_cm(self):
+        return timed(self.stage)        # one start time per call, also when decorating
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        dt = time.perf_counter() - self._t0
+        STAGES.observe(self.stage, dt)
+        if has_request_context():
+            g.setdefault("gpay_timings", []).append((self.stage, dt))
+        return False
+
+_TOKEN = re.compile(r"[^A-Za-z0-9_.-]+")
+
+def server_timing(entries: list[tuple[str, float]], total: float) -> str:
+    """Server-Timing value: stages summed by name in order of first use, then the total."""
+    durs: dict[str, float] = {}
+    for stage, dt in entries:
+        durs[stage] = durs.get(stage, 0.0) + dt
+    parts = [f"{_TOKEN.sub('_', s)};dur={d * 1000:.1f}" for s, d in durs.items()]
+    return ", ".join([*parts, f"total;dur={total * 1000:.1f}"])
+
+def _callback_name() -> str:
+    body = request.get_json(silent=True) or {}
+    return str(body.get("output", "unknown"))
+
+def _is_callback() -> bool:
+    return request.path.endswith("/_dash-update-component")
+
+# ---- profiling ----
+_PROFILE_LOCK = threading.Lock()     # one profiled request at a time per process
+
+def _after_fork_in_child() -> None:
+    # a background job forked while another thread held one of these would block on it forever
+    global _PROFILE_LOCK
+    _PROFILE_LOCK = threading.Lock()
+    for h in (CALLBACKS, STAGES):
+        h._lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+def _start_profile() -> None:
+    mode = config.PROFILE
+    if not mode or random.random() >= config.PROFILE_SAMPLE or not _PROFILE_LOCK.acquire(blocking=False):
+        return
+    if mode == "pyinstrument" and HAS_PYINSTRUMENT:
+        prof = _Pyinstrument()
+        prof.start()
+    else:
+        prof = cProfile.Profile()
+        prof.enable()
+    g.gpay_profile = prof
+
+def _stop_profile(_exc=None) -> None:
+    prof = g.pop("gpay_profile", None)
+    if prof is None:
+        return
+    try:
+        name = re.sub(r"[^A-Za-z0-9_-]+", "_", _callback_name()).strip("_")[:80]
+        stem = Path(config.PROFILE_DIR) / f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{name}"
+        stem.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(prof, cProfile.Profile):
+            prof.disable()
+            path = f"{stem}.prof"
+            prof.dump_stats(path)
+        else:
+            prof.stop()
+            path = f"{stem}.html"
+            Path(path).write_text(prof.output_html(), encoding="utf-8")
+        logger.info("profile written to %s", path)
+    except Exception:
+        logger.exception("could not write profile")
+    finally:
+        _PROFILE_LOCK.release()
+
+# ---- wiring ----
+def render_metrics(source=None) -> str:
+    from .utils.memo import cache_stats     # memo times its serialization with timed()
+    lines = CALLBACKS.render() + STAGES.render()
+    stats = cache_stats()
+    for field, kind, help_text in (("entries", "gauge", "Entries held by a memo cache."),
+                                   ("bytes", "gauge", "Estimated bytes held by a memo cache."),
+                                   ("hits", "counter", "Memo cache hits."),
+                                   ("misses", "counter", "Memo cache misses."),
+                                   ("evictions", "counter", "Memo cache evictions."),
+                                   ("coalesced", "counter", "Memo cache misses that waited for another request's computation.")):
+        name = f"gpay_cache_{field}" + ("_total" if kind == "counter" else "")
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        lines += [f'{name}{{cache="{s["name"]}"}} {s[field]}' for s in stats]
+    if source is not None:
+        lines += ["# HELP gpay_data_rows Transactions in the loaded data.", "# TYPE gpay_data_rows gauge",
+                  f"gpay_data_rows {len(source.ctx.df)}"]
+    return "\n".join(lines) + "\n"
+
+def install(server, source=None) -> None:
+    """Callback timing, Server-Timing headers, the metrics endpoint and sampled profiling on server."""
+    if not config.METRICS_ENABLED:
+        return
+
+    @server.before_request
+    def _begin():
+        if _is_callback():
+            g.gpay_t0 = time.perf_counter()
+            _start_profile()
+
+    @server.after_request
+    def _finish(response):
+        t0 = g.get("gpay_t0")
+        if t0 is not None:
+            total = time.perf_counter() - t0
+            CALLBACKS.observe(_callback_name(), total)
+            response.headers["Server-Timing"] = server_timing(g.get("gpay_timings", []), total)
+        return response
+
+    server.teardown_request(_stop_profile)
+
+    @server.route(config.METRICS_PATH)
+    def _metrics():
+        return Response(render_metrics(source), mimetype="text/plain; version=0.0.4")
@@ -1,41 +1,178 @@
+from dataclasses import dataclass
+
 import numpy as np
 import pandas as pd
 
+from . import config
+from .metrics import timed
+from .utils.filters import slice_sorted
+from .utils.frames import concat_frames
+
+RFM_OUTPUT = ["merchant","R","F","M","RFM_Score","last_date_str","frequency","monetary"]
+
+def _empty_rfm():
+    return pd.DataFrame(columns=RFM_OUTPUT)
+
+def pct_rank(x: np.ndarray) -> np.ndarray:
+    """Series.rank(pct=True) of a NaN-free array: average rank of ties / len(x)."""
+    n = len(x)
+    order = np.argsort(x)
+    xs = x[order]
+    starts = np.flatnonzero(np.r_[True, xs[1:] != xs[:-1]])
+    ends = np.r_[starts[1:], n]                     # exclusive
+    out = np.empty(n)
+    out[order] = np.repeat((starts + ends + 1) / 2.0, ends - starts)
+    return out / n
+
+def _bucket(ranks: np.ndarray, buckets: int, reverse: bool) -> np.ndarray:
+    """Bucket 1..buckets of percentile ranks, bins right-closed as pd.cut(include_lowest=True)."""
+    if reverse:
+        ranks = 1 - ranks
+    ranks = np.clip(ranks, 1e-9, 0.999999)
+    edges = np.arange(1, buckets) / buckets         # inner bin edges, e.g. 0.2 .. 0.8
+    return (np.searchsorted(edges, ranks, side="left") + 1).astype(np.int8)
+
+def _sampled_scores(x: np.ndarray, buckets: int, reverse: bool, sample_size: int, seed: int = 0) -> np.ndarray:
+    """
+    _bucket(pct_rank(x)) with ranks estimated against a uniform sample of x. The estimate only
+    changes bucket at a few sample values, so x is compared to those instead of being ranked.
+    """
+    m = sample_size
+    u, counts = np.unique(np.random.default_rng(seed).choice(x, size=m, replace=False), return_counts=True)
+    below = np.r_[0, np.cumsum(counts)]
+    # estimated rank in the gap before u[j] (even positions) and at u[j] (odd positions)
+    pct = np.empty(2 * len(u) + 1)
+    pct[0::2] = (2 * below + 1) / (2.0 * m)
+    pct[1::2] = (below[:-1] + below[1:] + 1) / (2.0 * m)
+    step = _bucket(pct, buckets, reverse).astype(np.int16)
+    out = np.full(len(x), step[0], dtype=np.int16)
+    for p in np.flatnonzero(np.diff(step)) + 1:
+        past = x >= u[p // 2] if p % 2 else x > u[p // 2 - 1]
+        out += (step[p] - step[p - 1]) * past
+    return out.astype(np.int8)
+
+def score_quantiles(values, reverse: bool = False, buckets: int | None = None,
+                    exact_max: int | None = None) -> np.ndarray:
+    """
+    int8 scores 1..buckets (default config.RFM_BUCKETS) by percentile rank, as
+    pd.cut(rank(pct=True)) into equal-width bins; reverse scores low values high and all-equal
+    input scores the middle bucket. Above exact_max values (default config.RFM_EXACT_MAX) the
+    ranks are estimated from a sample of config.RFM_SAMPLE values.
+    """
+    buckets = buckets or config.RFM_BUCKETS
+    exact_max = config.RFM_EXACT_MAX if exact_max is None else exact_max
+    x = np.asarray(values, dtype=float)
+    if len(x) == 0:
+        return np.empty(0, dtype=np.int8)
+    if x.min() == x.max():
+        return np.full(len(x), (buckets + 1) // 2, dtype=np.int8)
+    if len(x) > exact_max and len(x) > config.RFM_SAMPLE:
+        return _sampled_scores(x, buckets, reverse, config.RFM_SAMPLE)
+    return _bucket(pct_rank(x), buckets, reverse)
+
+def score_rfm(g: pd.DataFrame, merchant_col: str, asof) -> pd.DataFrame:
+    """
+    R/F/M quintile scores for per-merchant aggregates g (merchant_col, last_date, frequency,
+    monetary), recency measured from asof. Sorted best first.
+    """
+    g["recency_days"] = (asof - g["last_date"]).dt.days.astype(float)
+    g["R"] = score_quantiles(g["recency_days"].to_numpy(), reverse=True)
+    g["F"] = score_quantiles(g["frequency"].to_numpy())
+    g["M"] = score_quantiles(g["monetary"].to_numpy())
+    g["RFM_Score"] = g["R"].astype(int) + g["F"] + g["M"]
+    g["last_date_str"] = g["last_date"].dt.strftime("%Y-%m-%d")
+    g = g.sort_values(["RFM_Score","monetary","frequency"], ascending=[False, False, False])
+    g = g.rename(columns={merchant_col: "merchant"})
+    return g
+
+@timed("compute_rfm")
 def compute_rfm(d, merchant_col, date_col, amt_col):
     """
     RFM per merchant using COMPLETED + OUTFLOW only.
     Returns: merchant, R, F, M, RFM_Score, last_date_str, frequency, monetary
     """
     if merchant_col is None or d.empty:
-        return pd.DataFrame(columns=["merchant","R","F","M","RFM_Score","last_date_str","frequency","monetary"])
+        return _empty_rfm()
 
-    out = d[d["_flow"] == "Outflow"].copy()
+    out = d[d["_flow"] == "Outflow"]
     if out.empty:
-        return pd.DataFrame(columns=["merchant","R","F","M","RFM_Score","last_date_str","frequency","monetary"])
+        return _empty_rfm()
 
-    asof = out[date_col].max()
-    g = (out.groupby(merchant_col)
+    g = (out.groupby(merchant_col, observed=True)
              .agg(last_date=(date_col, "max"),
                   frequency=(merchant_col, "size"),
                   monetary=(amt_col, "sum"))
              .reset_index())
-    g["recency_days"] = (asof - g["last_date"]).dt.days.astype(float)
+    return score_rfm(g, merchant_col, out[date_col].max())
 
-    def score_quant(s: pd.Series, reverse: bool=False) -> pd.Series:
-        if s.nunique() == 1:
-            return pd.Series([3]*len(s), index=s.index)
-        ranks = s.rank(pct=True)
-        if reverse: ranks = 1 - ranks
-        bins = [0.0, 0.2, 0.4, 0.6, 0.8, 1.0]
-        labels = [1,2,3,4,5]
-        ranks = np.clip(ranks, 1e-9, 0.999999)
-        return pd.cut(ranks, bins=bins, labels=labels, include_lowest=True).astype(int)
-
-    g["R"] = score_quant(g["recency_days"], reverse=True)
-    g["F"] = score_quant(g["frequency"])
-    g["M"] = score_quant(g["monetary"])
-    g["RFM_Score"] = g[["R","F","M"]].sum(axis=1)
-    g["last_date_str"] = g["last_date"].dt.strftime("%Y-%m-%d")
-    g = g.sort_values(["RFM_Score","monetary","frequency"], ascending=[False, False, False])
-    g = g.rename(columns={merchant_col: "merchant"})
-    return g
+# ---- per-merchant partials ----
+# running state of one merchant over a bucket: last transaction time, count, amount
+_STATE = {"last_date": "max", "frequency": "sum", "monetary": "sum"}
+
+def _merge_states(parts: pd.DataFrame, keys: list) -> pd.DataFrame:
+    return parts.groupby(keys, observed=True, sort=True).agg(_STATE).reset_index()
+
+@dataclass
+class MerchantPartials:
+    """
+    RFM inputs of Completed Outflow rows pre-merged per (day, merchant) and (month, merchant),
+    both sorted by their bucket. Any date range is whole months from `monthly` plus the
+    partial months at its ends from `daily`, merged per merchant: the cost of an RFM table
+    then follows merchants x buckets in range, not transactions.
+    """
+    merchant_col: str
+    daily: pd.DataFrame      # _day, merchant_col, last_date, frequency, monetary
+    monthly: pd.DataFrame    # _month, merchant_col, last_date, frequency, monetary
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, date_col: str, amt_col: str, merchant_col: str) -> "MerchantPartials":
+        out = df.loc[df["_completed"].to_numpy() & (df["_flow"] == "Outflow").to_numpy(), [date_col, merchant_col, amt_col]]
+        daily = (out.groupby([out[date_col].dt.normalize().rename("_day"), merchant_col], observed=True, sort=True)
+                    .agg(last_date=(date_col, "max"), frequency=(date_col, "size"), monetary=(amt_col, "sum"))
+                    .reset_index())
+        return cls(merchant_col, daily, cls._months(daily, merchant_col))
+
+    @staticmethod
+    def _months(daily: pd.DataFrame, merchant_col: str) -> pd.DataFrame:
+        parts = daily.drop(columns="_day").assign(_month=daily["_day"].dt.to_period("M").dt.to_timestamp())
+        return _merge_states(parts, ["_month", merchant_col])
+
+    def merge(self, new: "MerchantPartials") -> "MerchantPartials":
+        """Partials of old + new rows; only buckets from new's first day/month on are re-merged."""
+        if new.daily.empty:
+            return self
+        m = self.merchant_col
+        first_day = new.daily["_day"].iloc[0]
+        cut = int(self.daily["_day"].searchsorted(first_day, side="left"))
+        daily = concat_frames([self.daily.iloc[:cut],
+                               _merge_states(concat_frames([self.daily.iloc[cut:], new.daily]), ["_day", m])])
+        month0 = first_day.to_period("M").to_timestamp()
+        mcut = int(self.monthly["_month"].searchsorted(month0, side="left"))
+        dcut = int(daily["_day"].searchsorted(month0, side="left"))
+        monthly = concat_frames([self.monthly.iloc[:mcut], self._months(daily.iloc[dcut:], m)])
+        return MerchantPartials(m, daily, monthly)
+
+    def for_range(self, start, end) -> pd.DataFrame:
+        """Per-merchant (merchant_col, last_date, frequency, monetary) of start..end (inclusive days)."""
+        s, e = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        full_from = s if s.day == 1 else s + pd.offsets.MonthBegin(1)
+        full_to = (e + pd.Timedelta(days=1)).to_period("M").to_timestamp()      # exclusive
+        one_day = pd.Timedelta(days=1)
+        if full_from >= full_to:
+            pieces = [slice_sorted(self.daily, "_day", s, e)]
+        else:
+            pieces = [slice_sorted(self.daily, "_day", s, full_from - one_day),
+                      slice_sorted(self.monthly, "_month", full_from, full_to - one_day),
+                      slice_sorted(self.daily, "_day", full_to, e)]
+        parts = concat_frames([p.drop(columns=p.columns[0]) for p in pieces])
+        return _merge_states(parts, [self.merchant_col])
+
+@timed("rfm_for_range")
+def rfm_for_range(partials: MerchantPartials | None, start, end) -> pd.DataFrame:
+    """compute_rfm of the Completed rows in start..end, from the precomputed partials."""
+    if partials is None:
+        return _empty_rfm()
+    g = partials.for_range(start, end)
+    if g.empty:
+        return _empty_rfm()
+    return score_rfm(g, partials.merchant_col, g["last_date"].max())
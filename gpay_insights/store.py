@@ -0,0 +1,114 @@
+# gpay_insights/store.py
+"""
+Columnar cache of normalized DataContext frames.
+
+One file per source CSV under config.CACHE_DIR, named "<stem>-<path hash>.<key>.<fmt>": the
+prefix tells sources apart (tx.csv from tx.parquet, a/tx.csv from b/tx.csv), the key is built
+from the source's path, size and mtime (optionally a content hash) plus STORE_VERSION. The column roles
+detected by data_loader.normalize_frame travel in the schema metadata, so a warm start
+is a single read with no CSV parsing.
+
+Two formats:
+- "parquet": compressed, read into process memory (default).
+- "arrow":   uncompressed Arrow IPC, memory-mapped read-only. Numeric/datetime columns
+             are then views of the OS page cache, so every gunicorn worker mapping the
+             same file shares one physical copy (config.SHARED_DATA_MMAP).
+"""
+from __future__ import annotations
+import glob
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    HAS_ARROW = True
+except Exception:
+    HAS_ARROW = False
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# bump when normalize_frame output changes so stale caches are ignored
+STORE_VERSION = 3
+_ROLES_KEY = b"gpay_insights.roles"
+
+def _file_digest(path: Path, chunk: int = 1 << 20) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while block := f.read(chunk):
+            h.update(block)
+    return h.hexdigest()
+
+def source_key(path: Path) -> str:
+    path = Path(path).resolve()
+    st = path.stat()
+    parts = [str(STORE_VERSION), str(path), str(st.st_size), str(st.st_mtime_ns)]
+    if config.CACHE_HASH_SOURCE:
+        parts.append(_file_digest(path))
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=12).hexdigest()
+
+def _cache_prefix(path: Path) -> str:
+    """Part of a cache file name shared by all versions of one source, and by no other source."""
+    path = Path(path)
+    return f"{path.stem}-{hashlib.blake2b(str(path.resolve()).encode(), digest_size=6).hexdigest()}"
+
+def cache_path(path: Path, fmt: str = "parquet") -> Path:
+    return Path(config.CACHE_DIR) / f"{_cache_prefix(path)}.{source_key(path)}.{fmt}"
+
+def _read_table(cp: Path, fmt: str):
+    if fmt == "arrow":
+        # the table's buffers keep the mapping alive; pages are shared with other processes
+        return ipc.open_file(pa.memory_map(str(cp), "r")).read_all()
+    return pq.read_table(cp)
+
+def _write_table(table, tmp: Path, fmt: str):
+    if fmt == "arrow":
+        with pa.OSFile(str(tmp), "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, tmp)
+
+def load_normalized(path: Path, fmt: str = "parquet") -> tuple[pd.DataFrame, dict] | None:
+    """(df, roles) from the cache, or None on a miss / without pyarrow."""
+    if not HAS_ARROW or not Path(path).exists():
+        return None
+    try:
+        cp = cache_path(path, fmt)
+        if not cp.exists():
+            return None
+        table = _read_table(cp, fmt)
+        roles = json.loads((table.schema.metadata or {})[_ROLES_KEY])
+        # split_blocks: one block per column, so mapped numeric columns are not consolidated (copied)
+        return table.to_pandas(split_blocks=True), roles
+    except Exception as e:
+        logger.warning("Ignoring unreadable data cache for %s: %s", path, e)
+        return None
+
+def save_normalized(path: Path, df: pd.DataFrame, roles: dict, fmt: str = "parquet") -> Path | None:
+    """Write df + roles for path; the file appears atomically. Old caches of the same source are removed."""
+    if not HAS_ARROW:
+        return None
+    try:
+        cp = cache_path(path, fmt)
+        cp.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        meta = dict(table.schema.metadata or {})
+        meta[_ROLES_KEY] = json.dumps(roles).encode()
+        tmp = cp.with_suffix(f".{os.getpid()}.tmp")
+        _write_table(table.replace_schema_metadata(meta), tmp, fmt)
+        os.replace(tmp, cp)
+        for old in cp.parent.glob(f"{glob.escape(_cache_prefix(path))}.*.{fmt}"):
+            if old != cp:
+                old.unlink(missing_ok=True)
+        return cp
+    except Exception as e:
+        logger.warning("Could not write data cache for %s: %s", path, e)
+        return None
@@ -0,0 +1,40 @@
+# gpay_insights/utils/classify.py
+"""Transaction-type classification, evaluated once per distinct type string."""
+import numpy as np
+import pandas as pd
+
+OUTFLOW_ALIASES = ("paid", "sent", "debit", "payment", "purchase", "bill", "charge")
+INFLOW_ALIASES  = ("received", "credit", "refund", "cashback")
+FLOW_LABELS = ["Outflow", "Inflow", "Unknown"]
+
+_PAID_KEYS = ("paid", "payment", "purchase", "bill", "charge", "debit")
+_SENT_KEYS = ("sent",)          # keep "sent" distinct if present
+_RECV_KEYS = ("received", "credit", "refund", "cashback")
+PSR_LABELS = ["Paid", "Received", "Sent"]   # sorted, the order groupby used for the pie
+
+def flow_direction(x) -> str:
+    s = str(x).lower()
+    if any(a in s for a in OUTFLOW_ALIASES): return "Outflow"
+    if any(a in s for a in INFLOW_ALIASES):  return "Inflow"
+    return "Unknown"
+
+def payment_class(s) -> str | None:
+    """Paid / Sent / Received (None if the type string says neither)."""
+    if not s: return None
+    s = str(s).lower()
+    if any(k in s for k in _RECV_KEYS): return "Received"
+    if any(k in s for k in _SENT_KEYS): return "Sent"
+    if any(k in s for k in _PAID_KEYS): return "Paid"
+    return None
+
+def classify_categorical(s: pd.Series, fn, labels: list[str]) -> pd.Series:
+    """
+    fn applied per distinct value of s, broadcast back through the category codes.
+    Returns a Categorical over labels (results not in labels become NaN).
+    """
+    cat = s if isinstance(s.dtype, pd.CategoricalDtype) else s.astype("category")
+    # one result per category, plus one for missing values (code -1 indexes the last slot)
+    results = [fn(c) for c in cat.cat.categories] + [fn(np.nan)]
+    lut = np.array([labels.index(r) if r in labels else -1 for r in results], dtype=np.int8)
+    codes = lut[cat.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=labels), index=s.index, name=s.name)
@@ -2,6 +2,8 @@ from datetime import date as _date
 import numpy as np
 import pandas as pd
 from .. import config
+from ..metrics import timed
+from .memo import FRAMES
 
 def month_start(d: _date) -> _date:
     return _date(d.year, d.month, 1)
@@ -18,16 +20,50 @@ def apply_filters(df: pd.DataFrame, date_col: str, start: _date, end: _date) ->
     return df[(df[date_col] >= pd.to_datetime(start)) &
               (df[date_col] <= (pd.to_datetime(end) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)))].copy()
 
+def date_bounds(dates: np.ndarray, start, end) -> tuple[int, int]:
+    """
+    Row positions [i, j) covering start..end (whole days, inclusive) in an ascending datetime64 array.
+    Two binary searches, no masks.
+    """
+    lo = np.datetime64(pd.Timestamp(start).normalize())
+    hi = np.datetime64(pd.Timestamp(end).normalize() + pd.Timedelta(days=1))
+    i = int(np.searchsorted(dates, lo, side="left"))
+    j = int(np.searchsorted(dates, hi, side="left"))
+    return i, max(i, j)
+
+def slice_sorted(df: pd.DataFrame, date_col: str, start, end) -> pd.DataFrame:
+    """Same rows as apply_filters, but df must be sorted by date_col; returns a view (no copy)."""
+    i, j = date_bounds(df[date_col].to_numpy(), start, end)
+    return df.iloc[i:j]
+
 def is_completed_series(s: pd.Series) -> pd.Series:
     if s is None: return pd.Series([True]*len(s))
     ss = s.astype(str).str.lower().str.strip()
     return ss.isin(config.COMPLETED_TOKENS)
 
 def apply_completed_only(df: pd.DataFrame, status_col: str | None) -> pd.DataFrame:
+    if "_completed" in df.columns:  # precomputed by load_data_context
+        return df[df["_completed"]].copy()
     if status_col and status_col in df.columns:
         return df[is_completed_series(df[status_col])].copy()
     return df.copy()
 
+def date_range_of(flt, datactx) -> tuple[str, str]:
+    """(start, end) ISO strings from the filters-store value, defaulting to the full range."""
+    flt = flt or {}
+    return flt.get("start", str(datactx.min_date)), flt.get("end", str(datactx.max_date))
+
+def filtered_frames(datactx, start, end):
+    """
+    (dff, dff_c, cube_c) for a date range: raw slice, its Completed rows, and the Completed cube
+    slice. Memoized per (data version, start, end) in memo.FRAMES, shared by every callback.
+    """
+    def build():
+        with timed("filter"):
+            dff = datactx.date_slice(start, end)
+            return dff, apply_completed_only(dff, datactx.status_col), datactx.cube_slice(start, end)
+    return FRAMES.get_or_compute((datactx.version, str(start), str(end)), build)
+
 def resolve_dates_by_trigger(trigger_id, date_start: str, date_end: str, year_val, slider_range, ctx):
     s = _date.fromisoformat(date_start) if date_start else ctx.min_date
     e = _date.fromisoformat(date_end) if date_end else ctx.max_date
@@ -23,3 +23,42 @@ def fmt_currency_indian(x) -> str:
     if x is None or (isinstance(x, float) and (np.isnan(x) or np.isinf(x))):
         return "—"
     return f"₹{indian_number(x)}"
+
+_MISSING = "—"
+_EXACT_MAX = 1e15      # beyond this float64 no longer holds whole rupees exactly: left to indian_number
+# digit groups as text, zero-padded (inner groups) and plain (leading group)
+_PAD3 = np.array([f"{i:03d}" for i in range(1000)], dtype=object)
+_PLAIN3 = np.array([str(i) for i in range(1000)], dtype=object)
+_PAD2 = np.array([f"{i:02d}" for i in range(100)], dtype=object)
+_PLAIN2 = _PLAIN3[:100]
+
+def indian_number_array(values) -> np.ndarray:
+    """
+    indian_number of every element, as an object array of str. Groups are cut with integer
+    arithmetic over the whole array and looked up in tables of their text, so the only
+    per-value work is joining them (one pass per two digits).
+    """
+    x = np.asarray(values, dtype=float).ravel()
+    out = np.full(len(x), _MISSING, dtype=object)
+    ok = np.isfinite(x)
+    big = ok & (np.abs(x) >= _EXACT_MAX)
+    ok &= ~big
+    v = x[ok]
+    n = np.abs(np.rint(v)).astype(np.int64)       # rint rounds halves to even, as round() does
+    rest = n // 1000
+    text = np.where(rest > 0, _PAD3[n % 1000], _PLAIN3[n % 1000])
+    live = np.flatnonzero(rest)
+    while len(live):
+        group, rest[live] = rest[live] % 100, rest[live] // 100
+        text[live] = np.where(rest[live] > 0, _PAD2[group], _PLAIN2[group]) + "," + text[live]
+        live = live[rest[live] > 0]
+    out[ok] = np.where(v < 0, "-" + text, text)
+    out[big] = [indian_number(float(b)) for b in x[big]]
+    return out
+
+def fmt_currency_indian_array(values) -> np.ndarray:
+    """fmt_currency_indian of every element (see indian_number_array)."""
+    out = indian_number_array(values)
+    filled = out != _MISSING
+    out[filled] = "₹" + out[filled]
+    return out
@@ -0,0 +1,30 @@
+# gpay_insights/utils/frames.py
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+def as_category(s: pd.Series) -> pd.Series:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s
+    # object first, so an all-empty chunk (read as float) still unions with text chunks
+    return s.astype(object).astype("category")
+
+def concat_frames(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate frames column by column; a column that is categorical in any frame stays
+    categorical (categories unioned, never widened to object). Differing categories are unioned
+    in sorted order, whatever order the frames arrived in; identical ones keep their order
+    (e.g. _flow's). Columns missing from a frame are filled with NA, in order of first appearance.
+    """
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    names = list(dict.fromkeys(c for f in frames for c in f.columns))
+    cols = {}
+    for c in names:
+        parts = [f[c] if c in f.columns else pd.Series([None] * len(f), dtype=object) for f in frames]
+        if any(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            parts = [as_category(p) for p in parts]
+            same = all(p.cat.categories.equals(parts[0].cat.categories) for p in parts[1:])
+            cols[c] = union_categoricals(parts, sort_categories=not same)
+        else:
+            cols[c] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(cols)
@@ -0,0 +1,201 @@
+# gpay_insights/utils/memo.py
+"""
+Bounded LRU caches shared by all callbacks in a worker process.
+
+FRAMES   holds filtered DataFrames (date slice, Completed slice, cube slice) per date range.
+PAYLOADS holds what callbacks send to the browser: serialized figure JSON, table rows, options.
+
+Keys always start with DataContext.version, so a reload never serves stale entries.
+Misses are single-flight: threads asking for a key that is already being computed wait for
+that computation instead of repeating it.
+
+Background jobs are forked from threaded workers. A child would inherit a lock or an
+in-flight key held by some other thread of the parent, with nobody left to release it, so
+every cache and single-flight starts the child with fresh locks and no flights.
+"""
+from __future__ import annotations
+import json
+import logging
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+from .. import config
+from ..metrics import timed
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_NBYTES = 1024
+
+_FORK_RESET = weakref.WeakSet()     # objects whose locks are replaced in a forked child
+
+def _after_fork_in_child() -> None:
+    for obj in list(_FORK_RESET):
+        obj._after_fork()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+def sizeof(value) -> int:
+    """Rough resident size of a cached value (shallow for frames: slices share their parent's buffers)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=False, deep=False).sum())
+    if isinstance(value, (tuple, list)):
+        return sum(sizeof(v) for v in value) or _DEFAULT_NBYTES
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return _DEFAULT_NBYTES
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = self.error = None
+
+class SingleFlight:
+    """
+    At most one running compute() per key; concurrent callers for that key share its result
+    (or error). A caller that has waited config.SINGLE_FLIGHT_WAIT_S computes on its own.
+    """
+
+    def __init__(self):
+        self._after_fork()
+        self.coalesced = 0          # calls answered by another thread's computation
+        _FORK_RESET.add(self)
+
+    def _after_fork(self):
+        self._flights: dict = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, compute):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            if not flight.done.wait(config.SINGLE_FLIGHT_WAIT_S):
+                logger.warning("gave up waiting for %r after %ss; computing it again", key, config.SINGLE_FLIGHT_WAIT_S)
+                return compute()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = compute()
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+class LRUCache:
+    """
+    Thread-safe LRU capped by entry count and by total (estimated) bytes, with hit/miss counters.
+    get_or_compute() coalesces concurrent misses of one key (see SingleFlight).
+    """
+
+    def __init__(self, name: str, max_entries: int, max_bytes: int):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: OrderedDict = OrderedDict()   # key -> (value, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+        self._flights = SingleFlight()
+        _FORK_RESET.add(self)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """(True, value) on a hit, (False, None) on a miss."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, item[0]
+
+    def put(self, key, value, nbytes: int | None = None):
+        nbytes = sizeof(value) if nbytes is None else int(nbytes)
+        if nbytes > self.max_bytes:
+            return value            # too big to keep at all
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, nbytes)
+            self._bytes += nbytes
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, nb) = self._data.popitem(last=False)
+                self._bytes -= nb
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, compute, nbytes=None):
+        hit, value = self.get(key)
+        if hit:
+            return value
+
+        def fill():
+            # looked up again: a computation of key may have finished since the miss above
+            with self._lock:
+                item = self._data.get(key)
+            if item is not None:
+                return item[0]
+            value = compute()
+            return self.put(key, value, nbytes(value) if callable(nbytes) else nbytes)
+        return self._flights.do(key, fill)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name, "entries": len(self._data), "bytes": self._bytes,
+                "max_entries": self.max_entries, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "coalesced": self._flights.coalesced,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+FRAMES = LRUCache("frames", config.FRAME_CACHE_ENTRIES, config.FRAME_CACHE_MB * 2**20)
+PAYLOADS = LRUCache("payloads", config.PAYLOAD_CACHE_ENTRIES, config.PAYLOAD_CACHE_MB * 2**20)
+
+def cached_figure(key, build):
+    """
+    Figure JSON for key, building (and serializing once) on a miss. The cached dict is what
+    Dash sends as-is, so a hit skips both the figure builder and plotly serialization.
+    """
+    size = []
+
+    def serialized():
+        fig = build()
+        with timed("to_json"):
+            raw = fig.to_json()
+        size.append(len(raw))
+        return json.loads(raw)
+    return PAYLOADS.get_or_compute(key, serialized, nbytes=lambda _: size[0])
+
+def cached_payload(key, build):
+    """Any other JSON-able callback output (table rows, dropdown options, KPI cards)."""
+    return PAYLOADS.get_or_compute(key, build, nbytes=lambda v: len(json.dumps(v, default=str)))
+
+def cache_stats() -> list[dict]:
+    return [FRAMES.stats(), PAYLOADS.stats()]
@@ -0,0 +1,97 @@
+# gpay_insights/utils/tables.py
+"""
+Backend paging / sorting / filtering for dash_table.DataTable with
+page_action / sort_action / filter_action = "custom".
+"""
+from __future__ import annotations
+import re
+import numpy as np
+import pandas as pd
+
+from ..metrics import timed
+
+# DataTable filter_query operators (longest first so "<=" wins over "<"); "s"/"i" prefixes select case
+_OPERATORS = [
+    ("ge", ">="), ("le", "<="), ("ne", "!="), ("lt", "<"), ("gt", ">"), ("eq", "="),
+    ("contains", "contains"), ("datestartswith", "datestartswith"),
+]
+_PART_RE = re.compile(
+    r"^\s*\{(?P<col>[^}]+)\}\s*(?P<case>[si]?)(?P<op>>=|<=|!=|<|>|=|eq|ne|lt|le|gt|ge|contains|datestartswith)\s*(?P<val>.*?)\s*$"
+)
+
+def parse_filter_query(query: str | None) -> list[tuple[str, str, bool, str]]:
+    """
+    '{F} >= 3 && {merchant} icontains amazon' -> [(col, op, case_insensitive, value), ...]
+    Values stay text (quotes stripped); _condition decides whether they are numbers.
+    """
+    out = []
+    for part in (query or "").split(" && "):
+        m = _PART_RE.match(part)
+        if not m:
+            continue
+        op = m["op"]
+        op = next((name for name, sym in _OPERATORS if op in (name, sym)), op)
+        val = m["val"]
+        if len(val) >= 2 and val[0] == val[-1] and val[0] in "'\"`":
+            val = val[1:-1]
+        out.append((m["col"], op, m["case"] == "i", val))
+    return out
+
+def _number(val: str) -> float | None:
+    try:
+        return float(val)
+    except ValueError:
+        return None
+
+def _condition(s: pd.Series, op: str, ci: bool, val: str) -> pd.Series:
+    if op == "contains":
+        return s.astype(str).str.contains(val, case=not ci, regex=False, na=False)
+    if op == "datestartswith":
+        txt = s.dt.strftime("%Y-%m-%dT%H:%M:%S") if pd.api.types.is_datetime64_any_dtype(s) else s.astype(str)
+        return txt.str.startswith(val, na=False)
+    num = _number(val) if pd.api.types.is_numeric_dtype(s) else None
+    if num is not None:
+        val = num                   # numeric column, numeric value: compare as numbers
+    else:
+        s = s.astype(str)
+        if ci:
+            s, val = s.str.lower(), val.lower()
+    return {"eq": s == val, "ne": s != val, "lt": s < val,
+            "le": s <= val, "gt": s > val, "ge": s >= val}[op]
+
+@timed("table_query")
+def apply_table_query(df: pd.DataFrame, filter_query: str | None = None, sort_by: list | None = None) -> pd.DataFrame:
+    """Rows of df matching filter_query, ordered by sort_by (DataTable's formats for both)."""
+    mask = None
+    for col, op, ci, val in parse_filter_query(filter_query):
+        if col not in df.columns:
+            continue
+        cond = _condition(df[col], op, ci, val).to_numpy(dtype=bool)
+        mask = cond if mask is None else (mask & cond)
+    if mask is not None:
+        df = df[mask]
+    sort_by = [s for s in (sort_by or []) if s.get("column_id") in df.columns]
+    if sort_by:
+        df = df.sort_values([s["column_id"] for s in sort_by],
+                            ascending=[s.get("direction") == "asc" for s in sort_by],
+                            kind="stable", na_position="last", key=_sort_key)
+    return df
+
+def _sort_key(s: pd.Series) -> pd.Series:
+    """Categoricals by their text, not their category order (which need not be alphabetical)."""
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        return s
+    rank = np.argsort(np.argsort(s.cat.categories.astype(str).to_numpy(), kind="stable")).astype(float)
+    codes = s.cat.codes.to_numpy()
+    return pd.Series(np.where(codes >= 0, rank[codes], np.nan), index=s.index)
+
+def page_records(df: pd.DataFrame, page_current: int | None, page_size: int | None,
+                 columns: list[str] | None = None) -> tuple[list[dict], int, int]:
+    """(records of the requested page, only `columns` when given; clamped page index; page count)."""
+    page_size = int(page_size or 12)
+    page_count = max(1, int(np.ceil(len(df) / page_size)))
+    page = min(max(int(page_current or 0), 0), page_count - 1)
+    rows = df.iloc[page * page_size:(page + 1) * page_size]
+    if columns is not None:
+        rows = rows[[c for c in columns if c in rows.columns]]
+    return rows.to_dict("records"), page, page_count
@@ -0,0 +1,78 @@
+# gpay_insights/warmup.py
+"""
+Filling the memo caches for the filter states most sessions start from.
+
+After startup, and after every reload (which empties the caches), the first visitor of the
+full range or of a year-dropdown year would pay for filtering, RFM, every figure and the
+forecast, and so would everyone arriving while that runs. install() computes those states
+up front in a daemon thread of each serving process: started by gunicorn's post_fork hook
+(gunicorn.conf.py) or else by the process's first request, and again after each reload.
+Never in create_app itself: under preload_app that is the gunicorn master, which must fork
+its workers without threads or process pools running. Requests arriving meanwhile wait on
+the same computations through memo's single-flight instead of starting their own.
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+
+from . import config
+from .metrics import timed
+from .utils.filters import resolve_dates_by_trigger
+
+logger = logging.getLogger(__name__)
+
+def filter_states(datactx) -> list[dict]:
+    """filters-store values of a fresh page (full range), then of each year-dropdown year, newest first."""
+    states = [{"start": str(datactx.min_date), "end": str(datactx.max_date)}]
+    for y in sorted(datactx.df[datactx.date_col].dt.year.unique(), reverse=True):
+        s, e = resolve_dates_by_trigger("year-dropdown", None, None, int(y), None, datactx)
+        flt = {"start": str(s), "end": str(e)}
+        if flt not in states:
+            states.append(flt)
+    return states
+
+def warm_up(source, warmers) -> None:
+    """Run every warmer on each filter state of source.ctx; stops when a reload replaces it."""
+    datactx = source.ctx
+    t0 = time.perf_counter()
+    states = filter_states(datactx)
+    with timed("warmup"):
+        for n, flt in enumerate(states):
+            if source.ctx is not datactx:
+                logger.info("warm-up of %s stopped after %d states: data reloaded", datactx.version, n)
+                return
+            for warm in warmers:
+                try:
+                    warm(flt)
+                except Exception:
+                    logger.exception("warm-up failed for %s", flt)
+    logger.info("warmed %d filter states of %s in %.1fs", len(states), datactx.version, time.perf_counter() - t0)
+
+_INSTALLED: list[tuple] = []       # (source, warmers) of each app built in this process
+_STARTED_PID = None                 # process whose first warm-up has been started
+_START_LOCK = threading.Lock()
+
+def _spawn(source, warmers) -> None:
+    threading.Thread(target=warm_up, args=(source, warmers), name="gpay-warmup", daemon=True).start()
+
+def start() -> None:
+    """Warm every installed app in a daemon thread, once per process (a pid check after the first call)."""
+    global _STARTED_PID
+    if _STARTED_PID == os.getpid():
+        return
+    with _START_LOCK:
+        if _STARTED_PID == os.getpid():
+            return
+        _STARTED_PID = os.getpid()
+        for source, warmers in _INSTALLED:
+            _spawn(source, warmers)
+
+def install(server, source, warmers) -> None:
+    """Warm on the server's first request (or gunicorn post_fork, see start), and after every reload of source."""
+    if not config.WARMUP:
+        return
+    _INSTALLED.append((source, warmers))
+    server.before_request(start)
+    source.on_swap.append(lambda _ctx: _spawn(source, warmers))
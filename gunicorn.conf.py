@@ -0,0 +1,12 @@
+# gunicorn settings, picked up automatically by `gunicorn wsgi:server`
+bind = "0.0.0.0:8000"
+workers = 3
+
+# load the app once in the master; workers share its data pages copy-on-write (see wsgi.py)
+preload_app = True
+
+def post_fork(server, worker):
+    # warm each worker's caches right away rather than on its first request; the master
+    # itself stays free of threads and process pools (see gpay_insights/warmup.py)
+    from gpay_insights import warmup
+    warmup.start()
@@ -1,6 +1,19 @@
+import gc
 from gpay_insights import create_app
 
 server, dash_app = create_app()
 
-# gunicorn example:
-# gunicorn wsgi:server -b 0.0.0.0:8000 --workers 3
+# With --preload the app (and its DataContext) is built once in the gunicorn master and
+# workers fork from it. Freezing the GC keeps the collector from writing to every
+# inherited object header, so those pages stay shared copy-on-write instead of being
+# duplicated per worker.
+gc.freeze()
+
+# gunicorn example (settings in gunicorn.conf.py):
+# gunicorn wsgi:server
+# or explicitly:
+# gunicorn wsgi:server -b 0.0.0.0:8000 --workers 3 --preload
+# New or appended exports under config.DATA_FILE are picked up by a watcher thread in each
+# worker on its own (config.RELOAD_INTERVAL_S); only the data loaded at startup is shared.
+# Set config.SHARED_DATA_MMAP = True to additionally map the data read-only from an
+# Arrow file, which stays shared even for workers restarted without --preload.